@@ -0,0 +1,291 @@
+# Load-aware admission control for the chat endpoints: degrade, then shed, under overload
+# Usage: ADMISSION_DEGRADE_WAIT_MS=250 ADMISSION_SHED_WAIT_MS=1000 python serve.py
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Serving modes, from cheapest to most expensive to leave
+NORMAL = 'normal'        # full scoring, chat logs to the database
+DEGRADED = 'degraded'    # cached answers, else keyword-only scoring; chat logs to the spill file
+SHEDDING = 'shedding'    # cached answers, else a fast 503 with Retry-After
+
+
+class AdmissionController:
+    """In-flight chat requests and their queue wait, and the serving mode they call for.
+
+    Queue wait is the time a request spent before scoring started: waiting
+    for one of ``scoring_slots`` (scoring is CPU-bound, so more threads
+    scoring at once only makes each of them slower), plus the time it sat in
+    a reverse proxy's queue when that proxy stamps ``X-Request-Start``. The
+    wait is smoothed into a moving average that decays with ``half_life``
+    seconds of inactivity, so a process that stopped scoring (because it is
+    shedding) still finds its way back to normal.
+    """
+
+    def __init__(self, degrade_in_flight: int = 32, shed_in_flight: int = 128,
+                 degrade_wait_ms: float = 250, shed_wait_ms: float = 1000,
+                 scoring_slots: int = 2, max_slot_wait_ms: float = 500,
+                 retry_after: float = 2, half_life: float = 1.0, enabled: bool = True):
+        self.degrade_in_flight = degrade_in_flight
+        self.shed_in_flight = shed_in_flight
+        self.degrade_wait = degrade_wait_ms / 1000.0
+        self.shed_wait = shed_wait_ms / 1000.0
+        self.scoring_slots = scoring_slots
+        self.max_slot_wait = max_slot_wait_ms / 1000.0
+        self.retry_after = retry_after
+        self.half_life = half_life
+        self.enabled = enabled
+        self.slots = threading.BoundedSemaphore(scoring_slots)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._wait_average = 0.0
+        self._wait_updated = time.monotonic()
+        self.mode = NORMAL
+        self.mode_since = time.time()
+        self.counts = {NORMAL: 0, DEGRADED: 0, SHEDDING: 0}
+        self.cache_answers = 0
+        self.keyword_answers = 0
+        self.slot_timeouts = 0
+        self.shed = 0
+        self.mode_changes = 0
+
+    def queue_wait(self) -> float:
+        """Smoothed queue wait in seconds, decayed for the time since the last observation"""
+        with self.lock:
+            return self._decayed_wait(time.monotonic())
+
+    def _decayed_wait(self, now: float) -> float:
+        return self._wait_average * 0.5 ** ((now - self._wait_updated) / self.half_life)
+
+    def observe_wait(self, seconds: float, weight: float = 0.2):
+        """Fold one request's queue wait into the moving average"""
+        now = time.monotonic()
+        with self.lock:
+            self._wait_average = self._decayed_wait(now) * (1 - weight) + seconds * weight
+            self._wait_updated = now
+
+    def _mode_for(self, in_flight: int, wait: float) -> str:
+        if not self.enabled:
+            return NORMAL
+        if in_flight >= self.shed_in_flight or wait >= self.shed_wait:
+            return SHEDDING
+        if in_flight >= self.degrade_in_flight or wait >= self.degrade_wait:
+            return DEGRADED
+        return NORMAL
+
+    def _update_mode(self) -> str:
+        # Called with the lock held
+        wait = self._decayed_wait(time.monotonic())
+        mode = self._mode_for(self.in_flight, wait)
+        if mode != self.mode:
+            logger.warning(f"Admission mode {self.mode} -> {mode} "
+                           f"({self.in_flight} in flight, queue wait {wait * 1000:.0f} ms)")
+            self.mode = mode
+            self.mode_since = time.time()
+            self.mode_changes += 1
+        return mode
+
+    @contextmanager
+    def request(self, upstream_wait: float = 0.0) -> Iterator[str]:
+        """Count a chat request in flight for the block; yields the mode to serve it in"""
+        if upstream_wait:
+            self.observe_wait(upstream_wait)
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            mode = self._update_mode()
+            self.counts[mode] += 1
+        try:
+            yield mode
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    @contextmanager
+    def scoring_slot(self, upstream_wait: float = 0.0) -> Iterator[bool]:
+        """Hold a scoring slot for the block; yields False if none freed up within the max wait"""
+        start = time.perf_counter()
+        acquired = self.slots.acquire(timeout=self.max_slot_wait) if self.enabled else False
+        self.observe_wait(upstream_wait + time.perf_counter() - start)
+        if not acquired and self.enabled:
+            with self.lock:
+                self.slot_timeouts += 1
+        try:
+            yield acquired or not self.enabled
+        finally:
+            if acquired:
+                self.slots.release()
+
+    def record(self, outcome: str):
+        """Count how a non-normal request was answered: 'cache', 'keyword' or 'shed'"""
+        with self.lock:
+            if outcome == 'cache':
+                self.cache_answers += 1
+            elif outcome == 'keyword':
+                self.keyword_answers += 1
+            else:
+                self.shed += 1
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        with self.lock:
+            # An idle process recovers without a request to notice it
+            self._update_mode()
+            return {
+                'enabled': self.enabled,
+                'mode': self.mode,
+                'mode_since': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.mode_since)),
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'queue_wait_ms': round(self._decayed_wait(time.monotonic()) * 1000, 1),
+                'thresholds': {
+                    'degrade_in_flight': self.degrade_in_flight,
+                    'shed_in_flight': self.shed_in_flight,
+                    'degrade_wait_ms': self.degrade_wait * 1000,
+                    'shed_wait_ms': self.shed_wait * 1000,
+                    'scoring_slots': self.scoring_slots,
+                    'max_slot_wait_ms': self.max_slot_wait * 1000,
+                },
+                'requests': dict(self.counts),
+                'cache_answers': self.cache_answers,
+                'keyword_answers': self.keyword_answers,
+                'slot_timeouts': self.slot_timeouts,
+                'shed': self.shed,
+                'mode_changes': self.mode_changes,
+            }
+
+
+def controller_from_env() -> AdmissionController:
+    """Build the process's controller from ADMISSION_* settings"""
+    return AdmissionController(
+        degrade_in_flight=int(os.getenv('ADMISSION_DEGRADE_IN_FLIGHT', '32')),
+        shed_in_flight=int(os.getenv('ADMISSION_SHED_IN_FLIGHT', '128')),
+        degrade_wait_ms=float(os.getenv('ADMISSION_DEGRADE_WAIT_MS', '250')),
+        shed_wait_ms=float(os.getenv('ADMISSION_SHED_WAIT_MS', '1000')),
+        scoring_slots=int(os.getenv('ADMISSION_SCORING_SLOTS', '2')),
+        max_slot_wait_ms=float(os.getenv('ADMISSION_MAX_SLOT_WAIT_MS', '500')),
+        retry_after=float(os.getenv('ADMISSION_RETRY_AFTER', '2')),
+        enabled=os.getenv('ADMISSION', '1') == '1',
+    )
+
+
+admission = controller_from_env()
+
+
+def parse_request_start(header: Optional[str], now: float = None) -> float:
+    """Seconds since a proxy's X-Request-Start stamp ("t=<epoch>" in s, ms or us); 0 if absent or bad"""
+    if not header:
+        return 0.0
+    try:
+        stamp = header.strip()
+        stamp = float(stamp[2:] if stamp.startswith('t=') else stamp)
+    except ValueError:
+        return 0.0
+    if stamp > 1e14:
+        stamp /= 1e6
+    elif stamp > 1e11:
+        stamp /= 1e3
+    waited = (now if now is not None else time.time()) - stamp
+    # Clock skew between proxy and app can make this negative; cap absurd values
+    return min(max(waited, 0.0), 60.0)
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this id is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SpillLog:
+    """Chat log rows diverted to a JSON lines file while the process is overloaded.
+
+    Each process appends to its own ``<prefix>.<pid>.jsonl`` (opened per row,
+    so nothing is buffered if the worker dies), and ``replay`` later moves
+    the rows of this process, and of processes that have exited, into the
+    database with their original timestamps.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.spilled = 0
+        self.replayed = 0
+
+    def path(self, pid: int = None) -> str:
+        """Spill file of a process (this one by default)"""
+        return f'{self.prefix}.{pid or os.getpid()}.jsonl'
+
+    def append(self, row: Tuple[str, str, float]):
+        """Spill one (user_query, bot_response, confidence_score) row, stamped with the current UTC time"""
+        line = json.dumps(list(row) + [time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())]) + '\n'
+        with self.lock:
+            with open(self.path(), 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.pending += 1
+            self.spilled += 1
+
+    def _replayable(self) -> List[str]:
+        """Spill files of this process and of processes that have exited"""
+        paths = []
+        for path in glob.glob(f'{glob.escape(self.prefix)}.*.jsonl'):
+            pid = path[len(self.prefix) + 1:-len('.jsonl')]
+            if pid.isdigit() and (int(pid) == os.getpid() or not process_alive(int(pid))):
+                paths.append(path)
+        return paths
+
+    def replay(self, write_rows: Callable[[List[Tuple]], None], batch_size: int = 500) -> int:
+        """Pass spilled (user_query, bot_response, confidence_score, timestamp) rows to ``write_rows`` in batches"""
+        replayed = 0
+        for path in self._replayable():
+            claimed = f'{path}.replaying-{os.getpid()}'
+            with self.lock:
+                try:
+                    # Only one process wins the rename; this process's appends wait on the lock
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    continue
+                if path == self.path():
+                    self.pending = 0
+            with open(claimed, encoding='utf-8') as f:
+                rows = []
+                for line in f:
+                    try:
+                        rows.append(tuple(json.loads(line)))
+                    except ValueError:
+                        # A worker killed mid-write leaves a partial last line
+                        logger.warning(f"Skipping unreadable line in {path}")
+            for start in range(0, len(rows), batch_size):
+                try:
+                    write_rows(rows[start:start + batch_size])
+                except Exception:
+                    # Keep what is left for the next replay
+                    with self.lock, open(self.path(), 'a', encoding='utf-8') as f:
+                        f.writelines(json.dumps(list(row)) + '\n' for row in rows[start:])
+                        self.pending += len(rows) - start
+                    os.remove(claimed)
+                    raise
+                replayed += len(rows[start:start + batch_size])
+            os.remove(claimed)
+        with self.lock:
+            self.replayed += replayed
+        return replayed
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        with self.lock:
+            return {'path': self.path(), 'pending': self.pending, 'spilled': self.spilled, 'replayed': self.replayed}
@@ -0,0 +1,366 @@
+# ASGI entry point for high-concurrency web traffic
+# Install: pip install starlette uvicorn
+# Run: python serve.py --asgi   (or: uvicorn asgi_app:app --workers 4)
+
+import asyncio
+import io
+import json
+import logging
+import os
+import secrets
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+# Share the same CollegeChatbot core (and loaded FAQ index) as the Flask app
+from college_chatbot import (
+    SESSION_COOKIE, SSE_HEADERS, UI_ASSET, CollegeChatbot, admin_authorized, admitted_matches,
+    chat_request_fields, chatbot, faq_listing_headers, forwarded_client, log_export_request, overloaded_reply,
+    proxy_queue_wait, sse_event, stream_request_fields, throttled_reply,
+)
+from admission import NORMAL, admission
+from faq_io import FAQImportError, detect_format, export_faqs, import_faqs
+from log_export import export_logs
+from rate_limit import check_rate_limit, rate_limit_stats
+from http_cache import etag_matches
+
+logger = logging.getLogger(__name__)
+
+# Scoring is CPU-bound, so it runs on a small pool instead of the event loop;
+# the loop itself only juggles sockets and can hold thousands of connections
+SCORING_THREADS = int(os.getenv('ASGI_SCORING_THREADS', '4'))
+LOG_QUEUE_SIZE = int(os.getenv('ASGI_LOG_QUEUE_SIZE', '10000'))
+
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix='scoring')
+
+
+class AsyncChatLogger:
+    """Collect chat logs on an asyncio queue and write them in batches off-loop"""
+
+    def __init__(self, chatbot: CollegeChatbot, batch_size: int = 200, maxsize: int = LOG_QUEUE_SIZE):
+        self.chatbot = chatbot
+        self.batch_size = batch_size
+        self.maxsize = maxsize
+        self.queue = None
+        self._task = None
+
+    async def start(self):
+        """Start the background writer task on the running loop"""
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, row: Tuple[str, str, float], spill: bool = False):
+        """Queue one (user_query, bot_response, confidence_score) row without waiting"""
+        if spill:
+            # Overloaded: leave the database alone until the overload passes
+            self.chatbot.spill_log.append(row)
+            return
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            logger.warning("Chat log queue full, dropping log entry")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await loop.run_in_executor(None, self.chatbot.log_conversations, batch)
+                if self.chatbot.spill_log.pending:
+                    await loop.run_in_executor(None, self.chatbot.replay_spilled_logs)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} chat logs: {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+    async def stop(self):
+        """Drain queued rows, then cancel the writer task"""
+        if self._task is None:
+            return
+        await self.queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+chat_logger = AsyncChatLogger(chatbot)
+
+
+async def run_blocking(func, *args, executor=None):
+    """Run a blocking chatbot call without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+async def home(request: Request):
+    """Main chat interface"""
+    status, body, headers = UI_ASSET.respond(
+        request.headers.get('if-none-match'), request.headers.get('accept-encoding')
+    )
+    return Response(body, status_code=status, headers=headers)
+
+
+async def ready(request: Request):
+    """Readiness probe: succeeds only once the FAQ index is loaded"""
+    if not chatbot.ready:
+        return JSONResponse({'status': 'loading'}, status_code=503)
+    return JSONResponse({'status': 'ready', 'faqs': len(chatbot.faqs), 'warmup': chatbot.warmup_report})
+
+
+def client_ip(request: Request) -> str:
+    """Address used to rate limit a web request"""
+    return forwarded_client(request.headers.get('x-forwarded-for'), request.client.host if request.client else '')
+
+
+def rate_limited(request: Request):
+    """A 429 response if this client is over its limit, else None"""
+    decision = check_rate_limit('web', client_ip(request))
+    if decision.allowed:
+        return None
+    payload, headers = throttled_reply(decision.retry_after)
+    return JSONResponse(payload, status_code=429, headers=headers)
+
+
+async def admitted_ranking(request: Request, mode: str, user_message: str, k: int, session_key: str,
+                           category: Optional[str]):
+    """admitted_matches on the scoring pool; time spent queued for a pool thread counts as queue wait"""
+    upstream_wait = proxy_queue_wait(request.headers.get('x-request-start'))
+    submitted = time.perf_counter()
+    return await run_blocking(
+        lambda: admitted_matches(chatbot, mode, user_message, k, session_key, category,
+                                 upstream_wait + time.perf_counter() - submitted),
+        executor=scoring_executor
+    )
+
+
+def overloaded(retry_after: float) -> JSONResponse:
+    """A fast 503 while shedding load"""
+    payload, headers = overloaded_reply(retry_after)
+    return JSONResponse(payload, status_code=503, headers=headers)
+
+
+def web_session(request: Request) -> Tuple[str, Optional[str]]:
+    """Session store key for a web client, plus a new cookie value if one must be issued"""
+    sid = request.cookies.get(SESSION_COOKIE)
+    if sid and len(sid) <= 64:
+        return f"web:{sid}", None
+    sid = secrets.token_urlsafe(16)
+    return f"web:{sid}", sid
+
+
+def set_session_cookie(response: Response, new_sid: Optional[str]):
+    """Send a newly issued session cookie"""
+    if new_sid:
+        response.set_cookie(SESSION_COOKIE, new_sid, max_age=int(chatbot.sessions.ttl), httponly=True, samesite='lax')
+
+
+async def json_body(request: Request):
+    """The request's JSON body ({} if empty), or None if it isn't valid JSON"""
+    body = await request.body()
+    try:
+        return json.loads(body) if body else {}
+    except ValueError:
+        return None
+
+
+async def chat(request: Request):
+    """Handle chat messages"""
+    throttled = rate_limited(request)
+    if throttled is not None:
+        return throttled
+
+    try:
+        user_message, category = chat_request_fields(await json_body(request))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    try:
+        session_key, new_sid = web_session(request)
+
+        with admission.request() as mode:
+            # Get response from chatbot, as cheaply as the current load demands
+            matches = await admitted_ranking(request, mode, user_message, 1, session_key, category)
+            if matches is None:
+                return overloaded(admission.retry_after)
+            if user_message.strip():
+                response, confidence, category = chatbot.answer_from_matches(matches)
+            else:
+                response, confidence, category = chatbot.find_best_answer(user_message)
+
+            # Log conversation
+            chat_logger.submit((user_message, response, confidence), spill=mode != NORMAL)
+
+        reply = JSONResponse({
+            'response': response,
+            'confidence': confidence,
+            'category': category
+        })
+        set_session_cookie(reply, new_sid)
+        return reply
+    except Exception as e:
+        logger.error(f"Error handling chat message: {e}")
+        return JSONResponse({
+            'response': 'Sorry, I encountered an error. Please try again.',
+            'confidence': 0.0,
+            'category': 'Error'
+        }, status_code=500)
+
+
+async def chat_stream(request: Request):
+    """Stream a chat reply as Server-Sent Events"""
+    throttled = rate_limited(request)
+    if throttled is not None:
+        return throttled
+
+    try:
+        user_message, category, suggestions = stream_request_fields(await json_body(request))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    session_key, new_sid = web_session(request)
+
+    with admission.request() as mode:
+        matches = await admitted_ranking(request, mode, user_message, suggestions + 1, session_key, category)
+    if matches is None:
+        return overloaded(admission.retry_after)
+
+    async def generate():
+        confidence = 0.0
+        for event, payload in chatbot.stream_answer(user_message, matches):
+            if event == 'meta':
+                confidence = payload['confidence']
+            elif event == 'done':
+                chat_logger.submit((user_message, payload.pop('response'), confidence), spill=mode != NORMAL)
+            yield sse_event(event, payload)
+
+    reply = StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS)
+    set_session_cookie(reply, new_sid)
+    return reply
+
+
+async def get_categories(request: Request):
+    """Get all FAQ categories"""
+    headers = faq_listing_headers(chatbot.faq_version)
+    if etag_matches(request.headers.get('if-none-match'), [headers['ETag']]):
+        return Response(status_code=304, headers=headers)
+    # Served from the in-memory FAQ set, so no need to leave the loop
+    return JSONResponse({'categories': chatbot.get_categories()}, headers=headers)
+
+
+async def get_faqs_by_category(request: Request):
+    """Get FAQs for a specific category"""
+    headers = faq_listing_headers(chatbot.faq_version)
+    if etag_matches(request.headers.get('if-none-match'), [headers['ETag']]):
+        return Response(status_code=304, headers=headers)
+    faqs = chatbot.get_faqs_by_category(request.path_params['category'])
+    return JSONResponse({'faqs': faqs}, headers=headers)
+
+
+def import_and_reindex(body, fmt: str) -> dict:
+    """Upsert FAQs from a spooled upload, then rebuild the index once"""
+    with body:
+        result = import_faqs(chatbot.db_path, io.TextIOWrapper(body, encoding='utf-8-sig', newline=''), fmt)
+    chatbot.load_faqs()
+    chatbot.publish_faq_version()
+    result['faq_version'] = chatbot.faq_version
+    result['faqs'] = len(chatbot.faqs)
+    return result
+
+
+async def import_faqs_endpoint(request: Request):
+    """Upsert FAQs from a streamed CSV or JSONL body, then reindex once"""
+    if not admin_authorized(request.headers.get('authorization')):
+        return JSONResponse({'error': 'Unauthorized'}, status_code=401)
+    try:
+        chatbot.ensure_faq_writable()
+        fmt = detect_format(request.query_params.get('format'), request.headers.get('content-type'))
+    except FAQImportError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    # Spool the upload (to disk past 8 MB) so the import itself can run off-loop
+    body = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    async for chunk in request.stream():
+        body.write(chunk)
+    body.seek(0)
+    try:
+        result = await run_blocking(import_and_reindex, body, fmt)
+    except FAQImportError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    return JSONResponse(result)
+
+
+async def export_faqs_endpoint(request: Request):
+    """Stream every FAQ as CSV or JSONL"""
+    if not admin_authorized(request.headers.get('authorization')):
+        return JSONResponse({'error': 'Unauthorized'}, status_code=401)
+    fmt = 'csv' if request.query_params.get('format') == 'csv' else 'jsonl'
+    # A sync iterator: Starlette pulls each chunk on a worker thread
+    return StreamingResponse(export_faqs(chatbot.db_path, fmt),
+                             media_type='text/csv' if fmt == 'csv' else 'application/x-ndjson')
+
+
+async def export_logs_endpoint(request: Request):
+    """Stream chat logs as NDJSON or CSV; ?since_id= for incremental pulls"""
+    if not admin_authorized(request.headers.get('authorization')):
+        return JSONResponse({'error': 'Unauthorized'}, status_code=401)
+    try:
+        fmt, since_id, until_id, headers = await run_blocking(log_export_request, request.query_params, chatbot.log_db_path)
+    except ValueError:
+        return JSONResponse({'error': 'since_id and limit must be integers'}, status_code=400)
+    # A sync iterator: Starlette pulls each page on a worker thread
+    return StreamingResponse(export_logs(chatbot.log_db_path, fmt, since_id, until_id),
+                             media_type=headers.pop('Content-Type'), headers=headers)
+
+
+async def get_metrics(request: Request):
+    """Get per-process serving metrics"""
+    return JSONResponse({
+        'rate_limits': rate_limit_stats(),
+        'matching': chatbot.matching_stats(),
+        'sessions': chatbot.sessions.stats(),
+        'cache_backend': chatbot.cache_backend.stats(),
+        'admission': dict(admission.stats(), spill=chatbot.spill_log.stats()),
+        'warmup': chatbot.warmup_report
+    })
+
+
+async def get_stats(request: Request):
+    """Get chatbot usage statistics"""
+    return JSONResponse(await run_blocking(chatbot.get_stats))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await chat_logger.start()
+    yield
+    await chat_logger.stop()
+    chatbot.close()
+
+
+routes: List[Route] = [
+    Route('/', home, methods=['GET']),
+    Route('/ready', ready, methods=['GET']),
+    Route('/chat', chat, methods=['POST']),
+    Route('/chat/stream', chat_stream, methods=['POST']),
+    Route('/api/categories', get_categories, methods=['GET']),
+    Route('/api/faqs/import', import_faqs_endpoint, methods=['POST']),
+    Route('/api/faqs/export', export_faqs_endpoint, methods=['GET']),
+    Route('/api/faqs/{category}', get_faqs_by_category, methods=['GET']),
+    Route('/api/logs', export_logs_endpoint, methods=['GET']),
+    Route('/api/metrics', get_metrics, methods=['GET']),
+    Route('/api/stats', get_stats, methods=['GET']),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
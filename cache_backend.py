@@ -0,0 +1,389 @@
+# Cache backends for ranked answers, conversation sessions and FAQ version broadcasts
+# Optional: pip install redis (CACHE_BACKEND=redis://host:6379/0 shares them across workers and machines)
+# Usage:
+#   python cache_backend.py stand-in --port 6390          # minimal Redis-compatible server for local testing
+#   CACHE_BACKEND=redis://localhost:6390/0 python serve.py
+
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """In-process key/value store with per-key expiry and LRU eviction.
+
+    Nothing is shared with other processes, so sessions stay per worker and
+    FAQ version broadcasts only reach chatbots in this process.
+    """
+
+    shared = False
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        # key -> (expires_at or None, value)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Value for ``key``, or None when missing or expired"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] <= now):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """Store ``value``, expiring after ``ttl`` seconds (never when None)"""
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        with self.lock:
+            return {'backend': 'memory', 'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class RedisCacheBackend:
+    """Redis (or anything speaking its protocol) shared by every worker and machine.
+
+    Every call has a short timeout. After an error the server is skipped for
+    ``retry_after`` seconds and lookups count as misses, so an unreachable
+    cache slows nothing down; answers are then computed locally.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, timeout: float = 0.1, retry_after: float = 5.0):
+        import redis
+        self.url = url
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.retry_after = retry_after
+        self.down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _call(self, method: str, *args, **kwargs):
+        if time.monotonic() < self.down_until:
+            return None
+        try:
+            return getattr(self.client, method)(*args, **kwargs)
+        except Exception as e:
+            self.errors += 1
+            self.down_until = time.monotonic() + self.retry_after
+            logger.warning(f"Cache backend {method} failed ({e}); retrying in {self.retry_after:.0f}s")
+            return None
+
+    def get(self, key: str) -> Optional[str]:
+        """Value for ``key``, or None when missing, expired or unreachable"""
+        value = self._call('get', key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode('utf-8')
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """Store ``value``, expiring after ``ttl`` seconds (never when None)"""
+        self._call('set', key, value, px=int(ttl * 1000) if ttl else None)
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'available': time.monotonic() >= self.down_until,
+        }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend chosen by $CACHE_BACKEND: a redis:// URL, or in-process (default)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = os.getenv('CACHE_BACKEND', 'memory')
+            if url.startswith(('redis://', 'rediss://', 'unix://')):
+                try:
+                    _backend = RedisCacheBackend(url, timeout=float(os.getenv('CACHE_TIMEOUT', '0.1')))
+                except ImportError:
+                    logger.warning("redis is not installed (pip install redis); caching in-process only")
+            if _backend is None:
+                _backend = MemoryCacheBackend()
+        return _backend
+
+
+def faq_version_key(db_path: str) -> str:
+    """Backend key holding the FAQ version last published for a database"""
+    return f'helpdesk:faq_version:{db_path}'
+
+
+class AnswerCache:
+    """Ranked (faq_id, confidence) pairs per cache key, in this process and, if shared, in the backend.
+
+    Keys include the FAQ version, so entries never go stale: a reload simply
+    starts using new keys, and the local LRU lets old ones age out.
+    """
+
+    def __init__(self, backend, local_entries: int = 10000, ttl: float = 3600):
+        self.backend = backend
+        self.local = MemoryCacheBackend(max_entries=local_entries) if local_entries else None
+        self.ttl = ttl
+        self.shared_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.local is not None
+
+    def get(self, key: str) -> Optional[List]:
+        """Cached pairs for ``key``"""
+        value = self.local.get(key)
+        if value is None and self.backend.shared:
+            value = self.backend.get(f'helpdesk:answer:{key}')
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(key, value)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, pairs: List):
+        """Cache pairs for ``key`` locally and in the shared backend"""
+        value = json.dumps(pairs)
+        self.local.set(key, value)
+        if self.backend.shared:
+            self.backend.set(f'helpdesk:answer:{key}', value, self.ttl)
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        if not self.enabled:
+            return {'enabled': False}
+        local = self.local.stats()
+        lookups = local['hits'] + local['misses']
+        return {
+            'enabled': True,
+            'entries': local['entries'],
+            'local_hits': local['hits'],
+            'shared_hits': self.shared_hits,
+            'misses': local['misses'] - self.shared_hits,
+            'hit_rate': round((local['hits'] + self.shared_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+class SharedSessionStore:
+    """SessionStore stand-in keeping conversation context in the shared backend.
+
+    A user's follow-up question can land on any worker or machine and still
+    see the previous answer's context. Expiry is left to the backend.
+    """
+
+    def __init__(self, backend, ttl: float = 900, namespace: str = ''):
+        self.backend = backend
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Context for ``key`` if it has not expired"""
+        value = self.backend.get(f'helpdesk:session:{self.namespace}:{key}')
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, context: Dict):
+        """Store context for ``key``, refreshing its TTL"""
+        self.backend.set(f'helpdesk:session:{self.namespace}:{key}', json.dumps(context), self.ttl)
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        return {'shared': True, 'ttl_seconds': self.ttl, 'hits': self.hits, 'misses': self.misses}
+
+
+class VersionWatcher:
+    """Poll the published FAQ version and call ``on_change`` when it moves.
+
+    Other nodes see a publish within ``interval`` seconds (plus their reload
+    time), even if they were idle. The thread starts on first use in each
+    process, since threads do not survive a server's fork.
+    """
+
+    def __init__(self, backend, key: str, interval: float, on_change: Callable[[str], None]):
+        self.backend = backend
+        self.key = key
+        self.interval = interval
+        self.on_change = on_change
+        self.seen = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+
+    def ensure_started(self):
+        """Start polling in this process, checking once right away"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self.check()
+            threading.Thread(target=self._run, args=(self._stop,), name='faq-version-watcher', daemon=True).start()
+
+    def _run(self, stop: threading.Event):
+        while not stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"FAQ version check failed: {e}")
+
+    def check(self):
+        """Call ``on_change`` if a version other than the last one seen has been published"""
+        version = self.backend.get(self.key)
+        if version is not None and version != self.seen:
+            self.seen = version
+            self.on_change(version)
+
+    def publish(self, version: str):
+        """Announce a new FAQ version to every node"""
+        self.seen = version
+        self.backend.set(self.key, version)
+
+    def stop(self):
+        """Stop polling"""
+        self._stop.set()
+        self._pid = None
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol (RESP2 and RESP3) for this app: HELLO, PING, GET, SET [EX|PX], DEL,
+    EXISTS, DBSIZE, FLUSHDB"""
+
+    protocol = 2
+
+    def read_command(self) -> Optional[List[str]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.decode('utf-8').split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+        return args
+
+    def reply(self, value):
+        if value is None:
+            self.wfile.write(b'_\r\n' if self.protocol == 3 else b'$-1\r\n')
+        elif isinstance(value, dict):
+            self.wfile.write(f'%{len(value)}\r\n'.encode() if self.protocol == 3 else f'*{len(value) * 2}\r\n'.encode())
+            for key, item in value.items():
+                self.reply(key)
+                self.reply(item)
+        elif isinstance(value, int):
+            self.wfile.write(f':{value}\r\n'.encode())
+        elif isinstance(value, Exception):
+            self.wfile.write(f'-ERR {value}\r\n'.encode())
+        elif value in ('OK', 'PONG'):
+            self.wfile.write(f'+{value}\r\n'.encode())
+        else:
+            data = value.encode('utf-8')
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(data), data))
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            command, args = args[0].upper(), args[1:]
+            if command == 'HELLO':
+                self.protocol = int(args[0]) if args else self.protocol
+                self.reply({'server': 'redis', 'version': '7.0.0', 'proto': self.protocol, 'id': 1,
+                            'mode': 'standalone', 'role': 'master'})
+            elif command == 'PING':
+                self.reply('PONG')
+            elif command == 'GET':
+                self.reply(store.get(args[0]))
+            elif command == 'SET':
+                ttl = None
+                if len(args) >= 4 and args[2].upper() in ('EX', 'PX'):
+                    ttl = float(args[3]) / (1000 if args[2].upper() == 'PX' else 1)
+                store.set(args[0], args[1], ttl)
+                self.reply('OK')
+            elif command == 'DEL':
+                with store.lock:
+                    self.reply(sum(store.entries.pop(key, None) is not None for key in args))
+            elif command == 'EXISTS':
+                self.reply(sum(store.get(key) is not None for key in args))
+            elif command == 'DBSIZE':
+                self.reply(len(store.entries))
+            elif command == 'FLUSHDB':
+                with store.lock:
+                    store.entries.clear()
+                self.reply('OK')
+            elif command in ('SELECT', 'CLIENT'):
+                self.reply('OK')
+            else:
+                self.reply(Exception(f"unknown command '{command}'"))
+            self.wfile.flush()
+
+
+def run_stand_in(host: str, port: int):
+    """Serve the Redis stand-in until interrupted"""
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((host, port), StandInHandler) as server:
+        server.daemon_threads = True
+        server.store = MemoryCacheBackend(max_entries=1000000)
+        print(f"🧪 Redis stand-in listening on redis://{host}:{port}/0 (in memory, for testing only)")
+        server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cache backend tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+    stand_in = commands.add_parser('stand-in', help="run a minimal in-memory Redis-compatible server")
+    stand_in.add_argument('--host', default='127.0.0.1')
+    stand_in.add_argument('--port', type=int, default=6390)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the cache backend CLI"""
+    args = parse_args(argv)
+    try:
+        run_stand_in(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -3,22 +3,396 @@
 
 import sqlite3
 import re
-from flask import Flask, request, jsonify, render_template_string
+import os
+import queue
+import atexit
+import logging
+import threading
+import time
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from datetime import datetime
 import difflib
-from typing import List, Dict, Tuple
+import hashlib
+import heapq
+import io
+import itertools
+import math
+import secrets
+import urllib.parse
+from collections import Counter
+from typing import Iterator, List, Dict, Optional, Tuple
 import json
 
+from http_cache import StaticAsset, etag_matches
+from rate_limit import check_rate_limit, rate_limit_stats
+from sessions import SessionStore
+from spelling import SpellingIndex
+from normalization import DEFAULT_SYNONYMS, Normalizer, normalizer_from_settings
+from embeddings import build_embedding_index, load_encoder
+from admission import NORMAL, SHEDDING, SpillLog, admission, parse_request_start
+from cache_backend import AnswerCache, SharedSessionStore, VersionWatcher, faq_version_key, get_backend
+from faq_io import (
+    FAQ_VERSION_STAMP, FAQImportError, FAQStamp, detect_format, ensure_unique_index, export_faqs, faq_version,
+    import_faqs,
+)
+from log_export import CHANNEL_PREFIX, export_bounds, export_logs
+from tenants import TENANT_ENVIRON_KEY, TenantMiddleware, registry_from_env
+
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+def chunk_text(text: str, size: int) -> Iterator[str]:
+    """Split text into pieces of at most ``size`` characters, preferring word boundaries"""
+    while len(text) > size:
+        cut = text.rfind(' ', 0, size) + 1 or size
+        yield text[:cut]
+        text = text[cut:]
+    if text:
+        yield text
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class ChatLogWriter:
+    """Batch chat log inserts on a background thread so replies never wait on a commit"""
+    
+    def __init__(self, chatbot, batch_size: int = 200, flush_interval: float = 0.5):
+        self.chatbot = chatbot
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        
+    def submit(self, row: Tuple[str, str, float]):
+        """Queue one (user_query, bot_response, confidence_score) row"""
+        if self._closed:
+            # A request that outlived close() (e.g. its tenant was evicted): write directly
+            self.chatbot.log_conversations([row])
+            return
+        self._ensure_started()
+        self.queue.put(row)
+        
+    def _ensure_started(self):
+        # Threads do not survive fork(), so each server worker starts its own
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='chat-log-writer', daemon=True)
+                self._thread.start()
+                
+    def _run(self):
+        while True:
+            row = self.queue.get()
+            if row is None:
+                self.queue.task_done()
+                return
+            batch = [row]
+            try:
+                while len(batch) < self.batch_size:
+                    row = self.queue.get(timeout=self.flush_interval)
+                    if row is None:
+                        # Put the sentinel back so the loop exits after this batch
+                        self.queue.task_done()
+                        self.queue.put(None)
+                        break
+                    batch.append(row)
+            except queue.Empty:
+                pass
+            try:
+                self.chatbot.log_conversations(batch)
+                if self.chatbot.spill_log.pending:
+                    # Back to normal: move rows spilled during the overload into the database
+                    self.chatbot.replay_spilled_logs()
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} chat logs: {e}")
+            for _ in batch:
+                self.queue.task_done()
+                
+    def flush(self):
+        """Block until every queued row has been written"""
+        if self._thread is not None and self._pid == os.getpid():
+            self.queue.join()
+            
+    def close(self):
+        """Flush pending rows and stop the writer thread"""
+        with self._lock:
+            thread = self._thread if self._pid == os.getpid() else None
+            self._thread = None
+            self._closed = True
+        if thread is not None and thread.is_alive():
+            self.queue.put(None)
+            thread.join()
+
+# Openings that mark a message as continuing the previous question
+FOLLOW_UP_CUES = ('and ', 'what about ', 'how about ', 'also ', 'what if ', 'same ', 'for ', 'in ', 'on ', 'during ')
+
+# (label, query) of the web UI's quick buttons
+WEB_QUICK_QUERIES = (
+    ('Admission Requirements', 'admission requirements'),
+    ('Tuition Payment', 'tuition payment'),
+    ('Class Registration', 'class registration'),
+    ('Housing', 'housing options'),
+    ('Library Hours', 'library hours'),
+)
+
+# Questions behind the Telegram bot's quick_* buttons
+QUICK_QUESTIONS = {
+    'quick_admission': 'What are the admission requirements?',
+    'quick_financial': 'What financial aid is available?',
+    'quick_housing': 'What housing options are available?',
+    'quick_library': 'What are library hours?'
+}
+
+# Result sizes requested by /chat and Telegram (1) and by the web UI's streamed replies (3 suggestions + 1)
+WARMUP_K = (1, 4)
+
+def log_spill_prefix(log_db_path: str) -> str:
+    """Default prefix of the spill files of a chat log database"""
+    return f'{os.path.splitext(log_db_path)[0]}.spill'
+
+class FAQIndex:
+    """Precomputed matching structures for one version of the FAQ set"""
+    
+    def __init__(self, faqs: List[Tuple], preprocess, normalizer: Normalizer, spelling_distance: int = 2):
+        self.faqs = faqs
+        self.normalizer = normalizer
+        # Preprocessed question text and normalized keyword terms per FAQ, aligned with faqs
+        self.entries = []
+        # keyword term -> positions of the FAQs listing it, for the keyword-first pass
+        self.keyword_index = {}
+        # category -> positions of its FAQs
+        self.category_positions = {}
+        self.position_by_id = {row[0]: position for position, row in enumerate(faqs)}
+        # EmbeddingIndex when semantic matching is enabled
+        self.embeddings = None
+        # Content hash of faqs, set by CollegeChatbot.build_index
+        self.faq_version = None
+        # Content hash of the synonym table the normalizer was built with, also set by build_index
+        self.synonyms_version = None
+        # surface word -> occurrences, for typo correction and long-query windowing
+        word_counts = {}
+        for position, (faq_id, category, question, answer, keywords) in enumerate(faqs):
+            question_text = preprocess(question)
+            keyword_words = preprocess(keywords).split()
+            keyword_terms = normalizer.terms(keyword_words)
+            self.entries.append((question_text, keyword_terms))
+            self.category_positions.setdefault(category, []).append(position)
+            for term in keyword_terms:
+                self.keyword_index.setdefault(term, []).append(position)
+            for word in itertools.chain(question_text.split(), keyword_words):
+                word_counts[word] = word_counts.get(word, 0) + 1
+                
+        # SequenceMatcher state with each question as the second sequence, indexed once per FAQ set
+        # (before gunicorn forks, with preload) and shared read-only by every thread; see question_matcher
+        self.question_matchers = []
+        for question_text, _ in self.entries:
+            matcher = difflib.SequenceMatcher(None)
+            matcher.set_seq2(question_text)
+            # Fills in the character counts quick_ratio() would otherwise compute on first use
+            matcher.quick_ratio()
+            self.question_matchers.append(matcher)
+            
+        self.vocabulary = set(word_counts)
+        # Typo-tolerant lookup of query words ("scholarhsip" -> "scholarships")
+        self.spelling = SpellingIndex(word_counts, max_distance=spelling_distance) if spelling_distance else None
+            
+        # word -> {category: weight}: how strongly a word points at each category
+        # (share of the category's FAQs using it, scaled by inverse document frequency)
+        document_frequency = {}
+        category_counts = {}
+        for position, (question_text, keyword_terms) in enumerate(self.entries):
+            category = faqs[position][1]
+            for word in normalizer.terms(question_text.split()) | keyword_terms:
+                document_frequency[word] = document_frequency.get(word, 0) + 1
+                counts = category_counts.setdefault(word, {})
+                counts[category] = counts.get(category, 0) + 1
+        self.category_terms = {}
+        for word, counts in category_counts.items():
+            idf = math.log(len(faqs) / document_frequency[word])
+            if idf > 0:
+                self.category_terms[word] = {
+                    category: count / len(self.category_positions[category]) * idf
+                    for category, count in counts.items()
+                }
+                
+    def query_terms(self, words: set) -> set:
+        """Matching terms for query words: typos corrected, then normalized like the FAQs"""
+        if self.spelling is not None:
+            words = {self.spelling.correct(word) or word for word in words}
+        return self.normalizer.terms(words)
+        
+    def classify(self, terms: set, max_categories: int, min_ratio: float = 0.5) -> List[str]:
+        """Most likely categories for a query's terms, or [] when nothing points anywhere"""
+        scores = {}
+        for word in terms:
+            for category, weight in self.category_terms.get(word, {}).items():
+                scores[category] = scores.get(category, 0.0) + weight
+        if not scores:
+            return []
+        best = max(scores.values())
+        ranked = sorted(scores, key=lambda category: -scores[category])
+        return [category for category in ranked[:max_categories] if scores[category] >= best * min_ratio]
 
 class CollegeChatbot:
-    def __init__(self, db_path='college_faq.db'):
+    def __init__(self, db_path='college_faq.db', async_logging=True,
+                 max_query_chars: int = None, match_budget_ms: float = None,
+                 log_db_path: str = None, faq_db_mode: str = None, warm: bool = True,
+                 answer_cache_size: int = None, spill_prefix: str = None):
+        # FAQs and chat logs may live in separate files, so log commits never
+        # lock (or evict cache pages of) the database every request reads from
         self.db_path = db_path
+        self.log_db_path = log_db_path or os.getenv('CHAT_LOG_DB') or db_path
+        # 'rw' (default), 'ro' (read-only, schema must exist) or 'immutable'
+        # (read-only, never changes while open: SQLite skips locking entirely)
+        self.faq_db_mode = faq_db_mode or os.getenv('FAQ_DB_MODE', 'rw')
+        if self.faq_db_mode not in ('rw', 'ro', 'immutable'):
+            raise ValueError(f"FAQ_DB_MODE must be rw, ro or immutable, not {self.faq_db_mode!r}")
+        if self.faq_db_mode != 'rw' and os.path.abspath(self.log_db_path) == os.path.abspath(db_path):
+            # Chat logs would keep writing to the file SQLite was told doesn't change
+            raise ValueError(f"FAQ_DB_MODE={self.faq_db_mode} needs chat logs in their own database; set CHAT_LOG_DB")
+        self.ready = False
+        self.log_writer = ChatLogWriter(self) if async_logging else None
+        # Where chat logs go while the process is overloaded, instead of the database; replay writes
+        # every row under the prefix to this log database, so each log database needs its own
+        self.spill_log = SpillLog(spill_prefix or os.getenv('CHAT_LOG_SPILL') or log_spill_prefix(self.log_db_path))
+        # Bound the cost of a single query: long messages are cut down to their most
+        # relevant window, and scoring stops with the best match so far once the
+        # per-request CPU budget is spent
+        if max_query_chars is None:
+            max_query_chars = int(os.getenv('MAX_QUERY_CHARS', '300'))
+        if match_budget_ms is None:
+            match_budget_ms = float(os.getenv('MATCH_BUDGET_MS', '50'))
+        self.max_query_chars = max_query_chars
+        self.match_budget = match_budget_ms / 1000.0
+        self.truncated_queries = 0
+        self.budget_exhausted = 0
+        self._local = threading.local()
+        # Ranked answers, sessions and FAQ version announcements; CACHE_BACKEND=redis://...
+        # shares them with the other workers and machines
+        self.cache_backend = get_backend()
+        if answer_cache_size is None:
+            answer_cache_size = int(os.getenv('ANSWER_CACHE_SIZE', '10000'))
+        self.answer_cache = AnswerCache(
+            self.cache_backend,
+            local_entries=answer_cache_size,
+            ttl=float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+        )
+        # Conversation context so follow-up questions resolve against the last answer
+        if self.cache_backend.shared:
+            self.sessions = SharedSessionStore(self.cache_backend, ttl=float(os.getenv('SESSION_TTL', '900')),
+                                               namespace=db_path)
+        else:
+            self.sessions = SessionStore(
+                max_sessions=int(os.getenv('SESSION_MAX', '50000')),
+                ttl=float(os.getenv('SESSION_TTL', '900'))
+            )
+        # Reload within CACHE_SYNC_INTERVAL seconds of an import by another worker (the version
+        # stamped in the FAQ database) or by another node (announced on a shared cache backend)
+        sync_interval = float(os.getenv('CACHE_SYNC_INTERVAL', '2'))
+        self.version_watchers = []
+        if sync_interval > 0 and self.faq_db_mode != 'immutable':
+            self.version_watchers.append(VersionWatcher(
+                FAQStamp(db_path, self.faq_connection), FAQ_VERSION_STAMP, sync_interval, self.sync_faq_version
+            ))
+        if sync_interval > 0 and self.cache_backend.shared:
+            self.version_watchers.append(VersionWatcher(
+                self.cache_backend, faq_version_key(db_path), sync_interval, self.sync_faq_version
+            ))
+        self.follow_up_words = int(os.getenv('FOLLOW_UP_WORDS', '5'))
+        self.context_bonus = float(os.getenv('CONTEXT_BONUS', '0.1'))
+        # Category-first matching: score only the FAQs of the query's likeliest categories
+        self.category_first = os.getenv('CATEGORY_FIRST', '1') == '1'
+        self.max_query_categories = int(os.getenv('MAX_QUERY_CATEGORIES', '2'))
+        # Edits tolerated when matching query words to FAQ keywords; 0 disables
+        self.spelling_distance = int(os.getenv('SPELLING_MAX_DISTANCE', '2'))
+        # Steps applied to FAQ keywords and query words before keyword matching
+        self.normalization = os.getenv('NORMALIZATION', 'synonyms,stem,stopwords')
+        # Optional semantic matcher for paraphrases that share no words with any FAQ
+        self.embeddings_enabled = os.getenv('EMBEDDINGS', '0') == '1'
+        self.embedding_weight = float(os.getenv('EMBEDDING_WEIGHT', '0.4'))
+        self.embedding_candidates = int(os.getenv('EMBEDDING_CANDIDATES', '10'))
+        self.embedding_cache = os.getenv('EMBEDDING_CACHE', f'{os.path.splitext(db_path)[0]}.embeddings.npz')
+        self.encoder = None
+        # Only one reload builds at a time, so an older FAQ set can't be swapped in last
+        self.reload_lock = threading.Lock()
+        self.ranked_queries = 0
+        self.scored_candidates = 0
+        # FAQs scored per query by the keyword-only scoring used under overload
+        self.degraded_candidates = int(os.getenv('DEGRADED_CANDIDATES', '50'))
+        # Everything that changes ranking besides the FAQs themselves; part of answer cache keys
+        self.scoring_settings = repr((
+            self.max_query_chars, self.category_first, self.max_query_categories, self.spelling_distance,
+            self.normalization, self.embeddings_enabled and (self.embedding_weight, self.embedding_candidates,
+                                                             os.getenv('EMBEDDING_MODEL')),
+        ))
+        self.warmup_report = None
         self.init_database()
         self.load_faqs()
+        if self.faq_db_mode == 'rw':
+            # e.g. FAQs edited with plain SQL while no server ran: stamp what was actually loaded
+            stamp = FAQStamp(db_path)
+            if stamp.get(FAQ_VERSION_STAMP) != self.faq_version:
+                stamp.set(FAQ_VERSION_STAMP, self.faq_version)
+        # Not ready until the usual questions are answered from the cache
+        if warm:
+            self.warm_up()
+        self.ready = True
         
+    def faq_connection(self) -> sqlite3.Connection:
+        """Connection to the FAQ store, read-only unless FAQ_DB_MODE is rw"""
+        if self.faq_db_mode in ('ro', 'immutable'):
+            option = 'mode=ro' if self.faq_db_mode == 'ro' else 'immutable=1'
+            return sqlite3.connect(f"file:{urllib.parse.quote(self.db_path)}?{option}", uri=True)
+        return sqlite3.connect(self.db_path)
+        
+    def log_connection(self) -> sqlite3.Connection:
+        """Connection to the chat log store"""
+        conn = sqlite3.connect(self.log_db_path)
+        if self.log_db_path != self.db_path:
+            # The log file holds nothing that can't be re-logged; trade fsyncs for throughput
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+        
+    def ensure_faq_writable(self):
+        """Refuse FAQ writes while the store is opened as immutable"""
+        if self.faq_db_mode == 'immutable':
+            raise FAQImportError("The FAQ store is opened as immutable (FAQ_DB_MODE); import with faq_io.py offline")
+            
     def init_database(self):
-        """Initialize the FAQ database with sample data"""
+        """Initialize the FAQ database with sample data, and the chat log tables"""
+        if self.faq_db_mode == 'rw':
+            self.init_faq_store()
+        self.init_log_store()
+        
+    def init_log_store(self):
+        """Create the chat log table (in the FAQ database unless CHAT_LOG_DB is set)"""
+        conn = sqlite3.connect(self.log_db_path)
+        cursor = conn.cursor()
+        if self.log_db_path != self.db_path:
+            # Write-ahead logging: appends don't block readers such as /api/stats and log exports
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_query TEXT,
+                bot_response TEXT,
+                confidence_score REAL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Lets log exports start from a point in time without scanning the table
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_logs_timestamp ON chat_logs (timestamp)')
+        conn.commit()
+        conn.close()
+        # Rows spilled by workers that exited before the overload passed
+        self.replay_spilled_logs()
+        
+    def init_faq_store(self):
+        """Create the FAQ tables and insert the sample FAQs into an empty database"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -34,15 +408,11 @@ class CollegeChatbot:
             )
         ''')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chat_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_query TEXT,
-                bot_response TEXT,
-                confidence_score REAL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_faqs_category ON faqs (category)')
+        try:
+            ensure_unique_index(cursor)
+        except FAQImportError as e:
+            logger.warning(f"Bulk FAQ import unavailable: {e}")
         
         # Insert sample FAQs
         sample_faqs = [
@@ -123,17 +493,91 @@ class CollegeChatbot:
                 INSERT INTO faqs (category, question, answer, keywords)
                 VALUES (?, ?, ?, ?)
             ''', sample_faqs)
+            
+        # Synonyms are mapped to their canonical term before stemming, for FAQs and queries alike
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS synonyms (
+                term TEXT PRIMARY KEY,
+                canonical TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('SELECT COUNT(*) FROM synonyms')
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany('INSERT INTO synonyms (term, canonical) VALUES (?, ?)', DEFAULT_SYNONYMS)
+            
+        # Version of the FAQs last written, polled by every worker to reload after an import
+        cursor.execute('CREATE TABLE IF NOT EXISTS faq_meta (key TEXT PRIMARY KEY, value TEXT)')
         
         conn.commit()
         conn.close()
         
     def load_faqs(self):
         """Load FAQs from database into memory"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, category, question, answer, keywords FROM faqs')
-        self.faqs = cursor.fetchall()
-        conn.close()
+        with self.reload_lock:
+            conn = self.faq_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, category, question, answer, keywords FROM faqs ORDER BY id')
+            faqs = cursor.fetchall()
+            conn.close()
+            self.build_index(faqs)
+            
+
+    def load_synonyms(self) -> Dict[str, str]:
+        """Load the synonym table as a term -> canonical term mapping"""
+        conn = self.faq_connection()
+        try:
+            pairs = conn.execute('SELECT term, canonical FROM synonyms').fetchall()
+        except sqlite3.OperationalError:
+            # A database from before the synonyms table, opened read-only so it was never added
+            logger.warning(f"No synonyms table in {self.db_path}; using the default synonyms")
+            pairs = DEFAULT_SYNONYMS
+        finally:
+            conn.close()
+        return {self.preprocess_text(term): self.preprocess_text(canonical) for term, canonical in pairs}
+        
+    def build_index(self, faqs: List[Tuple]):
+        """Build the in-memory lookup structures served instead of per-request queries"""
+        faqs_by_category = {}
+        for row in faqs:
+            faq_id, category, question, answer, keywords = row
+            faqs_by_category.setdefault(category, []).append({"question": question, "answer": answer})
+            
+        # Changes whenever any FAQ changes; used for HTTP ETags and answer cache keys
+        version = faq_version(faqs)
+        synonyms = self.load_synonyms()
+        index = FAQIndex(
+            faqs, self.preprocess_text, normalizer_from_settings(self.normalization, synonyms),
+            spelling_distance=self.spelling_distance
+        )
+        index.faq_version = version
+        # Synonyms change rankings without changing the FAQs; part of answer cache keys
+        index.synonyms_version = hashlib.sha1(repr(sorted(synonyms.items())).encode('utf-8')).hexdigest()[:16]
+        if self.embeddings_enabled:
+            if self.encoder is None:
+                self.encoder = load_encoder(os.getenv('EMBEDDING_MODEL'))
+            index.embeddings = build_embedding_index(faqs, version, self.encoder, self.embedding_cache)
+            
+        # Swap the whole index in at once so concurrent requests see one consistent version
+        self.index = index
+        self.faqs = faqs
+        self.faqs_by_category = faqs_by_category
+        self.categories = sorted(faqs_by_category)
+        self.faq_version = version
+        
+    def publish_faq_version(self):
+        """Tell the other workers (and nodes sharing the cache backend) to load the current FAQs"""
+        for watcher in self.version_watchers:
+            watcher.publish(self.faq_version)
+            
+    def sync_faq_version(self, version: str):
+        """Reload after another worker or node stamped or announced a different FAQ version"""
+        if version == self.faq_version:
+            return
+        logger.info(f"FAQ version {version} announced; reloading {self.db_path}")
+        self.load_faqs()
+        if self.faq_version != version:
+            # e.g. this machine's copy of the database hasn't been updated yet
+            logger.warning(f"Reloaded FAQs are version {self.faq_version}, not the announced {version}")
         
     def preprocess_text(self, text: str) -> str:
         """Clean and normalize text"""
@@ -161,21 +605,320 @@ class CollegeChatbot:
         final_score = (question_similarity * 0.6) + (keyword_score * 0.4)
         return final_score
         
-    def find_best_answer(self, user_query: str) -> Tuple[str, float, str]:
+    def prepare_query(self, user_query: str, vocabulary: set) -> str:
+        """Preprocess a query, cutting long ones down to their most relevant window"""
+        # Preprocessing is linear, but don't even do that for absurdly long pastes
+        query_text = self.preprocess_text(user_query[:self.max_query_chars * 20])
+        if len(query_text) <= self.max_query_chars:
+            return query_text
+            
+        self.truncated_queries += 1
+        words = query_text.split()
+        hits = [word in vocabulary for word in words]
+        
+        # Slide a window of at most max_query_chars over the words, keeping the one
+        # containing the most FAQ vocabulary
+        best_start, best_end, best_hits = 0, 0, -1
+        start, length, window_hits = 0, -1, 0
+        for end, word in enumerate(words):
+            length += len(word) + 1
+            window_hits += hits[end]
+            while length > self.max_query_chars and start <= end:
+                length -= len(words[start]) + 1
+                window_hits -= hits[start]
+                start += 1
+            if window_hits > best_hits:
+                best_start, best_end, best_hits = start, end + 1, window_hits
+        return ' '.join(words[best_start:best_end])
+        
+    def question_matcher(self, index: FAQIndex, position: int, query_text: str) -> difflib.SequenceMatcher:
+        """This thread's SequenceMatcher, comparing a query against one FAQ question.
+        
+        The question's indexed state (``FAQIndex.question_matchers``) is only read, so
+        pointing the thread's one matcher at it costs a dict update rather than
+        re-indexing the question, and no thread keeps a copy per FAQ.
+        """
+        matcher = getattr(self._local, 'matcher', None)
+        if matcher is None:
+            matcher = self._local.matcher = difflib.SequenceMatcher(None)
+        matcher.__dict__.update(index.question_matchers[position].__dict__)
+        matcher.set_seq1(query_text)
+        return matcher
+        
+    def find_top_answers(self, user_query: str, k: int = 3, session_key: str = None,
+                         category: str = None, keyword_only: bool = False) -> List[Dict]:
+        """Find the k best matching FAQs, best first.
+        
+        ``category`` limits scoring to one category unless nothing there matches
+        confidently. With a ``session_key``, FAQs in the previously matched
+        category get a small bonus, short follow-ups that don't match on their own
+        ("and for spring?") are rescored together with the previous question, and
+        a confident match becomes the context for the next message.
+        ``keyword_only`` is the cheap scoring used under overload (see ``score_faqs``).
+        """
+        context = self.sessions.get(session_key) if session_key else None
+        if context is None:
+            matches = self.rank_faqs(user_query, k, category=category, keyword_only=keyword_only)
+        else:
+            matches = self.rank_faqs(
+                user_query, k, boost_category=context['category'], boost=self.context_bonus, category=category,
+                keyword_only=keyword_only
+            )
+            
+        # A short follow-up-looking message that doesn't match on its own
+        if context and (not matches or matches[0]['confidence'] < 0.3) and self._looks_like_follow_up(user_query, context):
+            follow_up = self.rank_faqs(
+                f"{context['question']} {user_query}", k,
+                boost_category=context['category'], boost=self.context_bonus, category=category,
+                keyword_only=keyword_only
+            )
+            best = {match['faq_id']: match for match in matches}
+            for match in follow_up:
+                if match['faq_id'] not in best or match['confidence'] > best[match['faq_id']]['confidence']:
+                    best[match['faq_id']] = match
+            matches = sorted(best.values(), key=lambda match: self._boosted_score(match, context), reverse=True)[:k]
+            
+        if session_key and matches and matches[0]['confidence'] >= 0.3:
+            self.sessions.set(session_key, {
+                'category': matches[0]['category'],
+                'faq_id': matches[0]['faq_id'],
+                'question': matches[0]['question']
+            })
+        return matches
+        
+    def _looks_like_follow_up(self, user_query: str, context: Dict) -> bool:
+        """Short message that opens like a follow-up or mentions something from the last answer"""
+        query_text = self.preprocess_text(user_query)
+        words = query_text.split()
+        if not words or len(words) > self.follow_up_words:
+            return False
+        if query_text.startswith(FOLLOW_UP_CUES):
+            return True
+        index = self.index
+        position = index.position_by_id.get(context['faq_id'])
+        if position is None:
+            return False
+        answer_words = set(self.preprocess_text(index.faqs[position][3]).split())
+        return any(len(word) > 3 and word in answer_words for word in words)
+        
+    def _boosted_score(self, match: Dict, context: Dict) -> float:
+        """A match's confidence plus the session category bonus, for ordering only"""
+        return match['confidence'] + (self.context_bonus if match['category'] == context['category'] else 0.0)
+        
+    def rank_faqs(self, user_query: str, k: int, boost_category: str = None, boost: float = 0.0,
+                  category: str = None, keyword_only: bool = False) -> List[Dict]:
+        """Score FAQs against a query and return the k best, best first.
+        
+        Scores are the same as ``calculate_similarity``; FAQs in ``boost_category``
+        are ordered as if they scored ``boost`` more, but their confidence is
+        reported (and logged) without it. With embeddings enabled, the query's semantic nearest
+        neighbours are also scored and a score is raised towards their similarity
+        (never lowered), so paraphrases can match without shared words. Only FAQs in
+        ``category``, or else the query's likeliest categories, are scored unless that
+        finds no confident match. Within that, FAQs sharing keywords with the query go
+        first, FAQs whose score cannot reach the current top k are skipped, and
+        scoring stops at the CPU budget. Results are cached per FAQ version, so a
+        repeated question costs a dictionary lookup (or one round trip to a
+        shared cache backend); ``keyword_only`` rankings are served from the
+        cache but never stored in it.
+        """
+        if not user_query.strip():
+            return []
+        for watcher in self.version_watchers:
+            watcher.ensure_started()
+            
+        index = self.index
+        if not self.answer_cache.enabled:
+            return self.score_faqs(index, user_query, k, boost_category, boost, category, keyword_only)
+        key = self._answer_cache_key(index, user_query, k, boost_category, boost, category)
+        matches = self._cached_ranking(index, key)
+        if matches is not None:
+            return matches
+            
+        self._local.budget_exhausted = False
+        matches = self.score_faqs(index, user_query, k, boost_category, boost, category, keyword_only)
+        # A budget-cut ranking depends on how busy the machine was; don't serve it again
+        if not self._local.budget_exhausted and not keyword_only:
+            self.answer_cache.set(key, [[match['faq_id'], match['confidence']] for match in matches])
+        return matches
+        
+    def _answer_cache_key(self, index: FAQIndex, user_query: str, k: int, boost_category: str = None,
+                          boost: float = 0.0, category: str = None) -> str:
+        """Answer cache key of a ranking request against one index snapshot"""
+        key = hashlib.sha1(repr((
+            self.scoring_settings, index.synonyms_version,
+            self.preprocess_text(user_query[:self.max_query_chars * 20]), k, boost_category, boost, category,
+        )).encode('utf-8')).hexdigest()
+        return f'{index.faq_version}:{key}'
+        
+    def _cached_ranking(self, index: FAQIndex, key: str) -> Optional[List[Dict]]:
+        """Matches stored under ``key``, or None if missing or naming FAQs no longer in the index"""
+        cached = self.answer_cache.get(key)
+        if cached is None:
+            return None
+        matches = []
+        for faq_id, confidence in cached:
+            position = index.position_by_id.get(faq_id)
+            if position is None:
+                return None
+            faq_id, faq_category, question, answer, _ = index.faqs[position]
+            matches.append({"faq_id": faq_id, "category": faq_category, "question": question,
+                            "answer": answer, "confidence": confidence})
+        return matches
+        
+    def cached_matches(self, user_query: str, k: int, category: str = None) -> Optional[List[Dict]]:
+        """The k best matches from the answer cache alone (ignoring session context), or None on a miss"""
+        if not user_query.strip():
+            return []
+        if not self.answer_cache.enabled:
+            return None
+        index = self.index
+        return self._cached_ranking(index, self._answer_cache_key(index, user_query, k, category=category))
+        
+    def score_faqs(self, index: FAQIndex, user_query: str, k: int, boost_category: str = None,
+                   boost: float = 0.0, category: str = None, keyword_only: bool = False) -> List[Dict]:
+        """rank_faqs without the cache, against one index snapshot.
+        
+        ``keyword_only`` scores just the FAQs sharing the most keywords with the
+        query (at most ``degraded_candidates``), with no embeddings and no
+        category or full-scan fallback: the same scores, over far fewer FAQs.
+        """
+        faqs = index.faqs
+        deadline = time.perf_counter() + self.match_budget
+        query_text = self.prepare_query(user_query, index.vocabulary)
+        user_words = set(query_text.split())
+        query_terms = index.query_terms(user_words)
+        
+        # Keyword-first pass: cheap set lookups give the keyword score of every FAQ
+        keyword_matches = {}
+        for term in query_terms:
+            for position in index.keyword_index.get(term, ()):
+                keyword_matches[position] = keyword_matches.get(position, 0) + 1
+        keyword_hits = sorted(keyword_matches, key=lambda position: (-keyword_matches[position], position))
+        
+        # Semantic nearest neighbours, scored right after the keyword hits
+        if index.embeddings and not keyword_only:
+            semantic = index.embeddings.nearest(query_text, self.embedding_candidates)
+        else:
+            semantic = {}
+        semantic_hits = sorted((position for position in semantic if position not in keyword_matches),
+                               key=lambda position: -semantic[position])
+        weight = self.embedding_weight
+        
+        # Category-first pass: an explicit category, or the likeliest ones by keyword weight
+        if category in index.category_positions:
+            scope = [category]
+        elif self.category_first:
+            scope = index.classify(query_terms, self.max_query_categories)
+        else:
+            scope = []
+        in_scope = set()
+        for scoped_category in scope:
+            in_scope.update(index.category_positions[scoped_category])
+        if not in_scope:
+            in_scope = range(len(faqs))
+        elif category not in index.category_positions:
+            # A paraphrase may not point at its category through keywords at all
+            in_scope.update(semantic)
+            
+        def keyword_first(positions):
+            yield from (position for position in keyword_hits if position in positions)
+            yield from (position for position in semantic_hits if position in positions)
+            yield from (position for position in range(len(faqs))
+                        if position in positions and position not in keyword_matches and position not in semantic)
+            
+        def blend(score: float, position: int) -> float:
+            similarity = semantic.get(position)
+            if similarity is None:
+                return score
+            return max(score, score * (1 - weight) + similarity * weight)
+            
+        top = []  # min-heap of (score, -position); lower positions win ties like the original scan
+        scored = 0
+        
+        def score_positions(positions) -> bool:
+            """Add positions to the top k; False once the CPU budget is spent"""
+            nonlocal scored
+            for position in positions:
+                # Checked before the cheap bounds too, so pruned candidates count against the budget
+                if top and time.perf_counter() > deadline:
+                    # Degrade gracefully: answer with the best matches found so far
+                    self.budget_exhausted += 1
+                    self._local.budget_exhausted = True
+                    return False
+                keyword_score = keyword_matches.get(position, 0) / max(len(user_words), 1)
+                bonus = boost if boost and faqs[position][1] == boost_category else 0.0
+                matcher = self.question_matcher(index, position, query_text)
+                
+                # real_quick_ratio() and quick_ratio() are cheap upper bounds on ratio()
+                if len(top) == k and (
+                    blend((matcher.real_quick_ratio() * 0.6) + (keyword_score * 0.4), position) + bonus < top[0][0]
+                    or blend((matcher.quick_ratio() * 0.6) + (keyword_score * 0.4), position) + bonus < top[0][0]
+                ):
+                    continue
+                    
+                unboosted = blend((matcher.ratio() * 0.6) + (keyword_score * 0.4), position)
+                score = unboosted + bonus
+                scored += 1
+                # Ordered by the boosted score, reported without the bonus
+                if len(top) < k:
+                    heapq.heappush(top, (score, -position, unboosted))
+                else:
+                    heapq.heappushpop(top, (score, -position, unboosted))
+            return True
+            
+        if keyword_only:
+            # Overload: the strongest keyword hits only, wherever they are
+            score_positions(keyword_hits[:self.degraded_candidates])
+        elif score_positions(keyword_first(in_scope)) and len(in_scope) < len(faqs) and (not top or max(top)[0] < 0.3):
+            # The likely categories had nothing confident; fall back to the rest
+            score_positions(keyword_first(set(range(len(faqs))) - set(in_scope)))
+            
+        self.ranked_queries += 1
+        self.scored_candidates += scored
+        ranked = sorted(top, reverse=True)
+        return [
+            {"faq_id": faqs[-neg][0], "category": faqs[-neg][1], "question": faqs[-neg][2],
+             "answer": faqs[-neg][3], "confidence": min(unboosted, 1.0)}
+            for _, neg, unboosted in ranked
+        ]
+        
+    def matching_stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        return {
+            'faqs': len(self.faqs),
+            'max_query_chars': self.max_query_chars,
+            'match_budget_ms': self.match_budget * 1000,
+            'truncated_queries': self.truncated_queries,
+            'budget_exhausted': self.budget_exhausted,
+            'category_first': self.category_first,
+            'spelling_corrections': self.index.spelling.corrections if self.index.spelling else 0,
+            'embeddings': self.index.embeddings.encoder.name if self.index.embeddings else None,
+            'avg_scored_candidates': round(self.scored_candidates / max(self.ranked_queries, 1), 2),
+            'answer_cache': self.answer_cache.stats(),
+        }
+        
+    def find_best_answer(self, user_query: str, session_key: str = None, category: str = None,
+                         keyword_only: bool = False) -> Tuple[str, float, str]:
         """Find the best matching FAQ answer"""
         if not user_query.strip():
             return "Please ask me a question about the college!", 0.0, "General"
             
+        return self.answer_from_matches(
+            self.find_top_answers(user_query, 1, session_key=session_key, category=category,
+                                  keyword_only=keyword_only)
+        )
+        
+    def answer_from_matches(self, matches: List[Dict]) -> Tuple[str, float, str]:
+        """Turn ranked matches into a reply, falling back to general help on low confidence"""
         best_score = 0.0
         best_answer = "I'm sorry, I don't have information about that. Please contact the college helpdesk at help@college.edu or call (555) 123-4567 for assistance."
         best_category = "General"
         
-        for faq_id, category, question, answer, keywords in self.faqs:
-            score = self.calculate_similarity(user_query, question, keywords)
-            if score > best_score:
-                best_score = score
-                best_answer = answer
-                best_category = category
+        if matches and matches[0]["confidence"] > best_score:
+            best_score = matches[0]["confidence"]
+            best_answer = matches[0]["answer"]
+            best_category = matches[0]["category"]
                 
         # If confidence is too low, provide general help
         if best_score < 0.3:
@@ -189,37 +932,212 @@ class CollegeChatbot:
                 
         return best_answer, best_score, best_category
         
-    def log_conversation(self, user_query: str, bot_response: str, confidence_score: float):
-        """Log conversation to database"""
-        conn = sqlite3.connect(self.db_path)
+    def stream_answer(self, user_query: str, matches: List[Dict], chunk_size: int = 160,
+                      min_suggestion_score: float = 0.2) -> Iterator[Tuple[str, Dict]]:
+        """Yield (event, data) pairs for a streamed reply.
+        
+        ``meta`` (category and confidence) comes first, then the answer in
+        ``chunk`` pieces, one ``suggestion`` per runner-up match and ``done``.
+        """
+        if not user_query.strip():
+            response, confidence, category = self.find_best_answer(user_query)
+        else:
+            response, confidence, category = self.answer_from_matches(matches)
+        yield "meta", {"category": category, "confidence": confidence}
+        
+        for chunk in chunk_text(response, chunk_size):
+            yield "chunk", {"text": chunk}
+            
+        for match in matches:
+            if match["answer"] == response or match["confidence"] < min_suggestion_score:
+                continue
+            yield "suggestion", {
+                "question": match["question"],
+                "category": match["category"],
+                "confidence": match["confidence"]
+            }
+        yield "done", {"response": response}
+        
+    def warm_up(self, max_queries: int = None, timeout: float = None, log_rows: int = None) -> Dict:
+        """Rank the quick-button questions and the most frequent logged queries into the answer cache.
+        
+        Logged queries are counted by their normalized text over the last
+        ``log_rows`` chat logs, most frequent first, up to ``max_queries`` in all.
+        Each is ranked without session context at every size in ``WARMUP_K``,
+        until ``timeout`` seconds have passed. The report gives the duration and
+        the share of the sampled traffic the warmed queries cover.
+        """
+        if max_queries is None:
+            max_queries = int(os.getenv('WARMUP_QUERIES', '200'))
+        if timeout is None:
+            timeout = float(os.getenv('WARMUP_TIMEOUT', '20'))
+        if log_rows is None:
+            log_rows = int(os.getenv('WARMUP_LOG_ROWS', '50000'))
+        if max_queries <= 0 or not self.answer_cache.enabled:
+            self.warmup_report = {'enabled': False}
+            return self.warmup_report
+            
+        start = time.perf_counter()
+        conn = self.log_connection()
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.execute('SELECT user_query FROM chat_logs ORDER BY id DESC LIMIT ?', (log_rows,))
+        counts = Counter()
+        variants = {}
+        for (user_query,) in cursor:
+            # Count (and rank) what the user typed, not one key per bot user
+            user_query = CHANNEL_PREFIX.sub('', user_query or '')
+            normalized = self.preprocess_text(user_query)
+            if normalized:
+                counts[normalized] += 1
+                variants.setdefault(normalized, user_query)
+        conn.close()
+        sampled = sum(counts.values())
+        
+        queries = {}
+        for query in [query for _, query in WEB_QUICK_QUERIES] + list(QUICK_QUESTIONS.values()):
+            queries.setdefault(self.preprocess_text(query), query)
+        quick = len(queries)
+        for normalized, _ in counts.most_common():
+            if len(queries) >= max_queries:
+                break
+            queries.setdefault(normalized, variants[normalized])
+            
+        deadline = start + timeout
+        warmed = []
+        for normalized, query in queries.items():
+            if time.perf_counter() > deadline:
+                break
+            for k in WARMUP_K:
+                self.rank_faqs(query, k)
+            warmed.append(normalized)
+            
+        covered = sum(counts[normalized] for normalized in warmed)
+        self.warmup_report = {
+            'enabled': True,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+            'queries': len(warmed),
+            'planned': len(queries),
+            'quick_queries': quick,
+            'timed_out': len(warmed) < len(queries),
+            'log_rows_sampled': sampled,
+            'distinct_logged_queries': len(counts),
+            'coverage': round(covered / sampled, 3) if sampled else None,
+            'faq_version': self.faq_version,
+        }
+        logger.info(f"Warmed {len(warmed)} queries in {self.warmup_report['duration_ms']:.0f} ms, "
+                    f"covering {covered} of {sampled} recent chat messages")
+        return self.warmup_report
+        
+    def log_conversation(self, user_query: str, bot_response: str, confidence_score: float, spill: bool = False):
+        """Log conversation to database (or, with ``spill``, to the spill file until the overload passes)"""
+        if spill:
+            self.spill_log.append((user_query, bot_response, confidence_score))
+        elif self.log_writer is not None:
+            self.log_writer.submit((user_query, bot_response, confidence_score))
+        else:
+            self.log_conversations([(user_query, bot_response, confidence_score)])
+            if self.spill_log.pending:
+                self.replay_spilled_logs()
+            
+    def log_conversations(self, rows: List[Tuple[str, str, float]]):
+        """Write a batch of conversations in a single transaction"""
+        conn = self.log_connection()
+        cursor = conn.cursor()
+        cursor.executemany('''
             INSERT INTO chat_logs (user_query, bot_response, confidence_score)
             VALUES (?, ?, ?)
-        ''', (user_query, bot_response, confidence_score))
+        ''', rows)
         conn.commit()
         conn.close()
         
+    def replay_spilled_logs(self) -> int:
+        """Move chat logs spilled during an overload into the database, keeping their timestamps"""
+        def write(rows):
+            conn = self.log_connection()
+            conn.executemany('''
+                INSERT INTO chat_logs (user_query, bot_response, confidence_score, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+            conn.close()
+            
+        replayed = self.spill_log.replay(write)
+        if replayed:
+            logger.info(f"Replayed {replayed} spilled chat logs into {self.log_db_path}")
+        return replayed
+        
+    def close(self):
+        """Flush pending chat logs; call before the process exits"""
+        if self.log_writer is not None:
+            self.log_writer.close()
+        for watcher in self.version_watchers:
+            watcher.stop()
+        
     def get_categories(self) -> List[str]:
         """Get all available categories"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT category FROM faqs ORDER BY category')
-        categories = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return categories
+        return list(self.categories)
         
     def get_faqs_by_category(self, category: str) -> List[Dict]:
         """Get FAQs for a specific category"""
-        conn = sqlite3.connect(self.db_path)
+        return [dict(faq) for faq in self.faqs_by_category.get(category, [])]
+        
+    def get_stats(self, top_queries: int = 5) -> Dict:
+        """Get chatbot usage statistics"""
+        conn = self.log_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT question, answer FROM faqs WHERE category = ?', (category,))
-        faqs = [{"question": row[0], "answer": row[1]} for row in cursor.fetchall()]
+        
+        # Total conversations
+        cursor.execute('SELECT COUNT(*) FROM chat_logs')
+        total_conversations = cursor.fetchone()[0]
+        
+        # Average confidence score
+        cursor.execute('SELECT AVG(confidence_score) FROM chat_logs')
+        avg_confidence = cursor.fetchone()[0] or 0
+        
+        # Most common queries
+        cursor.execute('''
+            SELECT user_query, COUNT(*) as count 
+            FROM chat_logs 
+            GROUP BY user_query 
+            ORDER BY count DESC 
+            LIMIT ?
+        ''', (top_queries,))
+        common_queries = cursor.fetchall()
+        
         conn.close()
-        return faqs
+        
+        return {
+            'total_conversations': total_conversations,
+            'average_confidence': round(avg_confidence, 3),
+            'common_queries': [{'query': q[0], 'count': q[1]} for q in common_queries]
+        }
 
 # Initialize chatbot
-chatbot = CollegeChatbot()
+chatbot = CollegeChatbot(os.getenv('COLLEGE_FAQ_DB', 'college_faq.db'))
+atexit.register(chatbot.close)
+
+# Further colleges served by this process when TENANTS_CONFIG lists them; each
+# one's FAQ index is loaded on its first request (requests matching no tenant
+# are answered from the default database above)
+def tenant_chatbot(tenant) -> CollegeChatbot:
+    """A tenant's chatbot, loaded while a request waits (so warming up is left to preloaded tenants)"""
+    log_db_path = tenant.log_db_path or tenant.db_path
+    # Spilled logs stay next to the tenant's own log database whatever CHAT_LOG_SPILL says
+    return CollegeChatbot(tenant.db_path, log_db_path=log_db_path, warm=False,
+                          spill_prefix=log_spill_prefix(log_db_path))
+
+tenants = registry_from_env(tenant_chatbot)
+if tenants is not None:
+    app.wsgi_app = TenantMiddleware(app.wsgi_app, tenants)
+    atexit.register(tenants.close)
+
+def current_chatbot() -> CollegeChatbot:
+    """Chatbot for the college the current request was routed to"""
+    # Held for the whole request, so an eviction mid-request doesn't switch instances
+    if 'chatbot' not in g:
+        name = request.environ.get(TENANT_ENVIRON_KEY)
+        g.chatbot = tenants.get(name) if name else chatbot
+    return g.chatbot
 
 # HTML Template for web interface
 HTML_TEMPLATE = '''
@@ -345,6 +1263,10 @@ HTML_TEMPLATE = '''
             color: white; 
             border-color: #667eea;
         }
+        .suggestion {
+            display: inline-block;
+            margin: 0 6px 10px 0;
+        }
         .typing-indicator {
             display: none;
             padding: 10px 16px;
@@ -408,11 +1330,7 @@ HTML_TEMPLATE = '''
                 <button onclick="sendMessage()">Send</button>
             </div>
             <div class="categories">
-                <span class="category-btn" onclick="sendQuickQuery('admission requirements')">Admission Requirements</span>
-                <span class="category-btn" onclick="sendQuickQuery('tuition payment')">Tuition Payment</span>
-                <span class="category-btn" onclick="sendQuickQuery('class registration')">Class Registration</span>
-                <span class="category-btn" onclick="sendQuickQuery('housing options')">Housing</span>
-                <span class="category-btn" onclick="sendQuickQuery('library hours')">Library Hours</span>
+                <!-- quick queries -->
             </div>
         </div>
     </div>
@@ -443,21 +1361,62 @@ HTML_TEMPLATE = '''
             showTypingIndicator();
             
             try {
-                const response = await fetch('/chat', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ message: message })
-                });
-                
-                const data = await response.json();
-                hideTypingIndicator();
-                addMessage(data.response, 'bot');
+                await streamReply(message);
             } catch (error) {
                 hideTypingIndicator();
                 addMessage('Sorry, I encountered an error. Please try again.', 'bot');
             }
         }
 
+        // Render the reply from /chat/stream (Server-Sent Events) as it arrives
+        async function streamReply(message) {
+            const response = await fetch('chat/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: message })
+            });
+            if (!response.ok || !response.body) throw new Error('Stream unavailable');
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let botMessage = null;
+            let text = '';
+            
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                
+                let boundary;
+                while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                    const event = parseEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+                    
+                    if (event.name === 'meta') {
+                        hideTypingIndicator();
+                        botMessage = addMessage('', 'bot');
+                    } else if (event.name === 'chunk') {
+                        text += event.data.text;
+                        botMessage.innerHTML = text.replace(/\\n/g, '<br>');
+                        scrollToBottom();
+                    } else if (event.name === 'suggestion') {
+                        addSuggestion(event.data.question);
+                    }
+                }
+            }
+            if (!botMessage) throw new Error('Empty reply');
+        }
+
+        function parseEvent(raw) {
+            const event = { name: 'message', data: null };
+            raw.split('\\n').forEach(line => {
+                if (line.startsWith('event: ')) event.name = line.slice(7);
+                else if (line.startsWith('data: ')) event.data = JSON.parse(line.slice(6));
+            });
+            return event;
+        }
+
         function addMessage(message, sender) {
             const messagesContainer = document.getElementById('chatMessages');
             const messageDiv = document.createElement('div');
@@ -469,6 +1428,22 @@ HTML_TEMPLATE = '''
             
             messageDiv.appendChild(contentDiv);
             messagesContainer.appendChild(messageDiv);
+            scrollToBottom();
+            return contentDiv;
+        }
+
+        function addSuggestion(question) {
+            const messagesContainer = document.getElementById('chatMessages');
+            const suggestion = document.createElement('span');
+            suggestion.className = 'category-btn suggestion';
+            suggestion.textContent = `💡 ${question}`;
+            suggestion.onclick = () => sendQuickQuery(question);
+            messagesContainer.appendChild(suggestion);
+            scrollToBottom();
+        }
+
+        function scrollToBottom() {
+            const messagesContainer = document.getElementById('chatMessages');
             messagesContainer.scrollTop = messagesContainer.scrollHeight;
         }
 
@@ -486,23 +1461,178 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# The page has no template variables, so it is built (and compressed) once at import
+# Quick buttons come from WEB_QUICK_QUERIES, which the startup warm-up also answers
+HTML_TEMPLATE = HTML_TEMPLATE.replace('<!-- quick queries -->', '\n                '.join(
+    f'<span class="category-btn" onclick="sendQuickQuery(\'{query}\')">{label}</span>'
+    for label, query in WEB_QUICK_QUERIES
+))
+
+UI_ASSET = StaticAsset(
+    HTML_TEMPLATE.strip().encode('utf-8'),
+    'text/html; charset=utf-8',
+    cache_control=os.getenv('UI_CACHE_CONTROL', 'public, max-age=300'),
+)
+
 @app.route('/')
 def home():
     """Main chat interface"""
-    return render_template_string(HTML_TEMPLATE)
+    status, body, headers = UI_ASSET.respond(
+        request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding')
+    )
+    return Response(body, status=status, headers=headers)
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: succeeds only once the FAQ index is loaded"""
+    if not chatbot.ready:
+        return jsonify({'status': 'loading'}), 503
+    return jsonify({'status': 'ready', 'faqs': len(chatbot.faqs), 'warmup': chatbot.warmup_report})
+
+# Only trust X-Forwarded-For when reverse proxies in front of us set it: the number of
+# proxies that append to it (1 for a single nginx), 0 to ignore the header
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUST_PROXY_HEADERS') or '0')
+TRUST_PROXY_HEADERS = TRUSTED_PROXY_HOPS > 0
+
+def forwarded_client(forwarded_for: str, remote_addr: str) -> str:
+    """Client address recorded by our outermost trusted proxy in X-Forwarded-For"""
+    entries = [entry.strip() for entry in (forwarded_for or '').split(',') if entry.strip()]
+    if not TRUST_PROXY_HEADERS or not entries:
+        return remote_addr
+    # Proxies append the address they got the request from; entries further left are whatever the
+    # client sent, so keying on them would hand out a fresh rate limit bucket per forged value
+    return entries[-min(TRUSTED_PROXY_HOPS, len(entries))]
+
+def client_ip() -> str:
+    """Address used to rate limit the current web request"""
+    return forwarded_client(request.headers.get('X-Forwarded-For'), request.remote_addr)
+
+def throttled_reply(retry_after: float) -> Tuple[Dict, Dict[str, str]]:
+    """Body and headers for a 429 response"""
+    return {
+        'response': "You're sending messages too quickly. Please wait a moment and try again.",
+        'confidence': 0.0,
+        'category': 'Rate Limited'
+    }, {'Retry-After': str(math.ceil(retry_after))}
+
+def overloaded_reply(retry_after: float) -> Tuple[Dict, Dict[str, str]]:
+    """Body and headers for a 503 sent while shedding load"""
+    return {
+        'response': "The helpdesk is very busy right now. Please try again in a few seconds.",
+        'confidence': 0.0,
+        'category': 'Busy'
+    }, {'Retry-After': str(math.ceil(retry_after))}
+
+def proxy_queue_wait(header: str) -> float:
+    """Seconds a request waited in the reverse proxy's queue, from its X-Request-Start header"""
+    # Anyone could send the header, and an old stamp would push every client into degraded mode
+    return parse_request_start(header) if TRUST_PROXY_HEADERS else 0.0
+
+def admitted_matches(bot: CollegeChatbot, mode: str, user_message: str, k: int, session_key: str,
+                     category: str = None, upstream_wait: float = 0.0) -> Optional[List[Dict]]:
+    """Rank a chat message as far as the serving mode allows; None means shed it with a 503.
+    
+    Normal requests score in full once a scoring slot frees up. Degraded and
+    shedding requests (and normal ones that waited too long for a slot) take
+    a cached ranking when there is one; otherwise degraded requests get
+    keyword-only scoring and shedding ones are turned away.
+    """
+    if mode == NORMAL:
+        with admission.scoring_slot(upstream_wait) as acquired:
+            if acquired:
+                return bot.find_top_answers(user_message, k, session_key=session_key, category=category)
+    elif upstream_wait:
+        admission.observe_wait(upstream_wait)
+        
+    matches = bot.cached_matches(user_message, k, category=category)
+    if matches is not None:
+        admission.record('cache')
+        return matches
+    if mode == SHEDDING:
+        admission.record('shed')
+        return None
+    admission.record('keyword')
+    return bot.find_top_answers(user_message, k, session_key=session_key, category=category, keyword_only=True)
+
+# Identifies a browser's conversation for follow-up questions
+SESSION_COOKIE = 'helpdesk_sid'
+
+def web_session_key() -> str:
+    """Session store key for the current web client, issuing a cookie if needed"""
+    sid = request.cookies.get(SESSION_COOKIE)
+    if not sid or len(sid) > 64:
+        sid = g.new_session_id = secrets.token_urlsafe(16)
+    return f"web:{sid}"
+
+@app.after_request
+def set_session_cookie(response):
+    """Send the session cookie issued during this request"""
+    sid = g.pop('new_session_id', None)
+    if sid:
+        response.set_cookie(SESSION_COOKIE, sid, max_age=int(current_chatbot().sessions.ttl), httponly=True,
+                            samesite='Lax')
+    return response
+
+def json_body():
+    """The request's JSON body ({} if empty), or None if it isn't valid JSON"""
+    data = request.get_json(silent=True)
+    if data is None and not request.get_data():
+        return {}
+    return data
+
+def chat_request_fields(data) -> Tuple[str, Optional[str]]:
+    """Message and optional category of a /chat body; ValueError if malformed"""
+    if not isinstance(data, dict):
+        raise ValueError('request body must be a JSON object')
+    user_message = data.get('message', '')
+    if not isinstance(user_message, str):
+        raise ValueError('message must be a string')
+    category = data.get('category')
+    if category is not None and not isinstance(category, str):
+        raise ValueError('category must be a string')
+    return user_message, category
+
+def stream_request_fields(data) -> Tuple[str, Optional[str], int]:
+    """Message, category and suggestion count (clamped to 0-10) of a /chat/stream body; ValueError if malformed"""
+    user_message, category = chat_request_fields(data)
+    try:
+        suggestions = int(data.get('suggestions', 3))
+    except (TypeError, ValueError):
+        raise ValueError('suggestions must be an integer')
+    return user_message, category, max(0, min(suggestions, 10))
 
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat messages"""
+    decision = check_rate_limit('web', client_ip())
+    if not decision.allowed:
+        payload, headers = throttled_reply(decision.retry_after)
+        return jsonify(payload), 429, headers
+        
     try:
-        data = request.json
-        user_message = data.get('message', '')
+        user_message, category = chat_request_fields(json_body())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
         
-        # Get response from chatbot
-        response, confidence, category = chatbot.find_best_answer(user_message)
+    try:
+        bot = current_chatbot()
         
-        # Log conversation
-        chatbot.log_conversation(user_message, response, confidence)
+        with admission.request() as mode:
+            # Get response from chatbot, as cheaply as the current load demands
+            matches = admitted_matches(
+                bot, mode, user_message, 1, web_session_key(), category,
+                proxy_queue_wait(request.headers.get('X-Request-Start'))
+            )
+            if matches is None:
+                payload, headers = overloaded_reply(admission.retry_after)
+                return jsonify(payload), 503, headers
+            if user_message.strip():
+                response, confidence, category = bot.answer_from_matches(matches)
+            else:
+                response, confidence, category = bot.find_best_answer(user_message)
+                
+            # Log conversation (to the spill file while overloaded, sparing the database)
+            bot.log_conversation(user_message, response, confidence, spill=mode != NORMAL)
         
         return jsonify({
             'response': response,
@@ -516,55 +1646,160 @@ def chat():
             'category': 'Error'
         }), 500
 
+# Disable proxy buffering so each event reaches the browser as soon as it is written
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+# FAQ listings only change with the FAQ set: let clients and proxies store them but revalidate
+FAQ_CACHE_CONTROL = os.getenv('FAQ_CACHE_CONTROL', 'public, no-cache')
+
+def faq_listing_headers(faq_version: str) -> Dict[str, str]:
+    """Caching headers for responses derived from the given FAQ set"""
+    return {'ETag': f'"{faq_version}"', 'Cache-Control': FAQ_CACHE_CONTROL}
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream a chat reply as Server-Sent Events"""
+    decision = check_rate_limit('web', client_ip())
+    if not decision.allowed:
+        payload, headers = throttled_reply(decision.retry_after)
+        return jsonify(payload), 429, headers
+        
+    try:
+        user_message, category, suggestions = stream_request_fields(json_body())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    bot = current_chatbot()
+    # Score before streaming starts so errors still become a normal 500
+    with admission.request() as mode:
+        matches = admitted_matches(
+            bot, mode, user_message, suggestions + 1, web_session_key(), category,
+            proxy_queue_wait(request.headers.get('X-Request-Start'))
+        )
+    if matches is None:
+        payload, headers = overloaded_reply(admission.retry_after)
+        return jsonify(payload), 503, headers
+    
+    def generate():
+        confidence = 0.0
+        for event, payload in bot.stream_answer(user_message, matches):
+            if event == 'meta':
+                confidence = payload['confidence']
+            elif event == 'done':
+                # The full response is only needed for the log, not by the client
+                bot.log_conversation(user_message, payload.pop('response'), confidence, spill=mode != NORMAL)
+            yield sse_event(event, payload)
+            
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
     """Get all FAQ categories"""
-    categories = chatbot.get_categories()
-    return jsonify({'categories': categories})
+    bot = current_chatbot()
+    headers = faq_listing_headers(bot.faq_version)
+    if etag_matches(request.headers.get('If-None-Match'), [headers['ETag']]):
+        return Response(status=304, headers=headers)
+    categories = bot.get_categories()
+    return jsonify({'categories': categories}), 200, headers
 
 @app.route('/api/faqs/<category>', methods=['GET'])
 def get_faqs_by_category(category):
     """Get FAQs for a specific category"""
-    faqs = chatbot.get_faqs_by_category(category)
-    return jsonify({'faqs': faqs})
+    bot = current_chatbot()
+    headers = faq_listing_headers(bot.faq_version)
+    if etag_matches(request.headers.get('If-None-Match'), [headers['ETag']]):
+        return Response(status=304, headers=headers)
+    faqs = bot.get_faqs_by_category(category)
+    return jsonify({'faqs': faqs}), 200, headers
+
+FAQ_ADMIN_TOKEN = os.getenv('FAQ_ADMIN_TOKEN')
+
+def admin_authorized(authorization: str) -> bool:
+    """Check an Authorization header against FAQ_ADMIN_TOKEN (admin endpoints are off without one)"""
+    if not FAQ_ADMIN_TOKEN:
+        return False
+    return secrets.compare_digest((authorization or '').encode(), f'Bearer {FAQ_ADMIN_TOKEN}'.encode())
+
+@app.route('/api/faqs/import', methods=['POST'])
+def import_faqs_endpoint():
+    """Upsert FAQs from a streamed CSV or JSONL body, then reindex once"""
+    if not admin_authorized(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    bot = current_chatbot()
+    try:
+        bot.ensure_faq_writable()
+        fmt = detect_format(request.args.get('format'), request.content_type)
+        # Read the body incrementally; a large upload never sits in memory whole
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        result = import_faqs(bot.db_path, stream, fmt)
+    except FAQImportError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    # Requests keep being served from the old index until the new one is swapped in
+    bot.load_faqs()
+    bot.publish_faq_version()
+    result['faq_version'] = bot.faq_version
+    result['faqs'] = len(bot.faqs)
+    return jsonify(result)
+
+@app.route('/api/faqs/export', methods=['GET'])
+def export_faqs_endpoint():
+    """Stream every FAQ as CSV or JSONL"""
+    if not admin_authorized(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    fmt = 'csv' if request.args.get('format') == 'csv' else 'jsonl'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(export_faqs(current_chatbot().db_path, fmt)), mimetype=mimetype)
+
+def log_export_request(args, log_db_path: str) -> Tuple[str, int, int, Dict[str, str]]:
+    """Format, id range and response headers for a /api/logs request"""
+    fmt = 'csv' if args.get('format') == 'csv' else 'ndjson'
+    since_id, until_id = export_bounds(
+        log_db_path, int(args.get('since_id') or 0), args.get('since'), int(args.get('limit') or 0) or None
+    )
+    headers = {
+        'Content-Type': 'text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        # Pass this as since_id on the next pull to continue where this export ends
+        'X-Last-Id': str(until_id),
+    }
+    return fmt, since_id, until_id, headers
+
+@app.route('/api/logs', methods=['GET'])
+def export_logs_endpoint():
+    """Stream chat logs as NDJSON or CSV; ?since_id= for incremental pulls"""
+    if not admin_authorized(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    log_db_path = current_chatbot().log_db_path
+    try:
+        fmt, since_id, until_id, headers = log_export_request(request.args, log_db_path)
+    except ValueError:
+        return jsonify({'error': 'since_id and limit must be integers'}), 400
+    return Response(stream_with_context(export_logs(log_db_path, fmt, since_id, until_id)), headers=headers)
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Get per-process serving metrics"""
+    bot = current_chatbot()
+    metrics = {
+        'rate_limits': rate_limit_stats(),
+        'matching': bot.matching_stats(),
+        'sessions': bot.sessions.stats(),
+        'cache_backend': bot.cache_backend.stats(),
+        'admission': dict(admission.stats(), spill=bot.spill_log.stats()),
+        'warmup': bot.warmup_report
+    }
+    if tenants is not None:
+        metrics['tenants'] = tenants.stats()
+    return jsonify(metrics)
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get chatbot usage statistics"""
-    conn = sqlite3.connect(chatbot.db_path)
-    cursor = conn.cursor()
-    
-    # Total conversations
-    cursor.execute('SELECT COUNT(*) FROM chat_logs')
-    total_conversations = cursor.fetchone()[0]
-    
-    # Average confidence score
-    cursor.execute('SELECT AVG(confidence_score) FROM chat_logs')
-    avg_confidence = cursor.fetchone()[0] or 0
-    
-    # Most common queries
-    cursor.execute('''
-        SELECT user_query, COUNT(*) as count 
-        FROM chat_logs 
-        GROUP BY user_query 
-        ORDER BY count DESC 
-        LIMIT 5
-    ''')
-    common_queries = cursor.fetchall()
-    
-    conn.close()
-    
-    return jsonify({
-        'total_conversations': total_conversations,
-        'average_confidence': round(avg_confidence, 3),
-        'common_queries': [{'query': q[0], 'count': q[1]} for q in common_queries]
-    })
+    return jsonify(current_chatbot().get_stats())
 
 if __name__ == '__main__':
-    print("🎓 College Helpdesk Chatbot Starting...")
-    print("📱 Web Interface: http://localhost:5000")
-    print("🔌 API Endpoint: http://localhost:5000/chat")
-    print("📊 Statistics: http://localhost:5000/api/stats")
-    print("📚 Categories: http://localhost:5000/api/categories")
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    import sys
+    # Reuse this already-loaded module instead of importing (and indexing) it twice
+    sys.modules.setdefault('college_chatbot', sys.modules[__name__])
+    from serve import main
+    main()
@@ -0,0 +1,177 @@
+# Semantic matching: FAQ embeddings with an approximate nearest neighbour index
+# Install: pip install numpy
+# Optional: pip install sentence-transformers (a real local model instead of hashed features)
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class HashedEncoder:
+    """Dependency-free fallback: word and character trigram features hashed into a fixed vector.
+
+    It has no notion of meaning, but catches inflections, compound words and
+    typos that the word-level matchers miss ("wifi" / "wi-fi", "prereqs" /
+    "prerequisites").
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f'hashed-{dim}'
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'little')
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def encode(self, texts: List[str]):
+        """Unit-length vectors, one row per text"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'\w+', text.lower()):
+                features = [f'w:{word}']
+                padded = f'<{word}>'
+                features.extend(f'c:{padded[i:i + 3]}' for i in range(len(padded) - 2))
+                for feature in features:
+                    column, sign = self._bucket(feature)
+                    # Whole words count double so shared words outweigh shared fragments
+                    vectors[row, column] += sign * (2.0 if feature[0] == 'w' else 1.0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class SentenceTransformerEncoder:
+    """A small local CPU model such as all-MiniLM-L6-v2 (name or path to a downloaded copy)"""
+
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model, device='cpu')
+        self.name = f'st-{os.path.basename(model.rstrip("/"))}'
+
+    def encode(self, texts: List[str]):
+        """Unit-length vectors, one row per text"""
+        vectors = self.model.encode(texts, batch_size=64, normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def load_encoder(model: Optional[str] = None):
+    """The configured model if sentence-transformers can load it, else hashed features"""
+    if model:
+        try:
+            return SentenceTransformerEncoder(model)
+        except Exception as e:
+            logger.warning(f"Embedding model {model} unavailable ({e}); using hashed features")
+    return HashedEncoder()
+
+
+class EmbeddingIndex:
+    """FAQ vectors plus a random-hyperplane LSH index for nearest neighbour lookups.
+
+    Small FAQ sets are searched exhaustively (one matrix-vector product);
+    above ``brute_force_limit`` vectors only the LSH buckets the query falls
+    into are compared, falling back to a full scan when they hold fewer than
+    k. Query vectors are cached per preprocessed query text.
+    """
+
+    def __init__(self, vectors, encoder, tables: int = 8, bits: int = 10,
+                 brute_force_limit: int = 5000, cache_size: int = 20000):
+        self.vectors = vectors
+        self.encoder = encoder
+        self.brute_force = len(vectors) <= brute_force_limit
+        self.cache_size = cache_size
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.planes = None
+        self.buckets = []
+        if not self.brute_force:
+            # Fixed seed: the same FAQs always hash into the same buckets
+            rng = np.random.default_rng(13)
+            self.planes = rng.standard_normal((tables, bits, vectors.shape[1])).astype(np.float32)
+            self.powers = 1 << np.arange(bits)
+            for table_planes in self.planes:
+                codes = ((vectors @ table_planes.T) > 0) @ self.powers
+                buckets = {}
+                for position, code in enumerate(codes.tolist()):
+                    buckets.setdefault(code, []).append(position)
+                self.buckets.append({code: np.array(positions) for code, positions in buckets.items()})
+
+    def embed(self, text: str):
+        """Vector for a query, cached"""
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.encoder.encode([text])[0]
+            with self.lock:
+                if len(self.cache) >= self.cache_size:
+                    self.cache.clear()
+                self.cache[text] = vector
+        return vector
+
+    def nearest(self, text: str, k: int) -> Dict[int, float]:
+        """Up to k FAQ positions most similar to ``text``, with their cosine similarity"""
+        query = self.embed(text)
+        if self.brute_force:
+            candidates = np.arange(len(self.vectors))
+        else:
+            hits = [
+                table.get(int(((table_planes @ query) > 0) @ self.powers))
+                for table_planes, table in zip(self.planes, self.buckets)
+            ]
+            hits = [positions for positions in hits if positions is not None]
+            candidates = np.unique(np.concatenate(hits)) if hits else np.arange(0)
+            if len(candidates) < k:
+                # The query landed in sparse buckets; an exact scan is the only honest answer
+                candidates = np.arange(len(self.vectors))
+
+        similarities = self.vectors[candidates] @ query
+        if len(candidates) > k:
+            best = np.argpartition(-similarities, k)[:k]
+            candidates, similarities = candidates[best], similarities[best]
+        return {int(position): float(similarity)
+                for position, similarity in zip(candidates, similarities) if similarity > 0}
+
+
+def faq_texts(faqs: List[tuple]) -> List[str]:
+    """Text embedded for each FAQ: the question followed by its keywords"""
+    return [f'{question} {keywords}' for _, _, question, _, keywords in faqs]
+
+
+def build_embedding_index(faqs: List[tuple], faq_version: str, encoder, cache_path: Optional[str] = None
+                          ) -> Optional[EmbeddingIndex]:
+    """Embed the FAQs, reusing vectors persisted for the same FAQ version and encoder"""
+    if np is None:
+        logger.warning("numpy is not installed; semantic matching disabled")
+        return None
+    if not faqs:
+        return None
+
+    key = f'{faq_version}:{encoder.name}'
+    vectors = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as saved:
+                if str(saved['key']) == key:
+                    vectors = saved['vectors']
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding cache {cache_path}: {e}")
+
+    if vectors is None:
+        vectors = encoder.encode(faq_texts(faqs))
+        if cache_path:
+            try:
+                # Write then rename, so other workers never read half a file
+                temp_path = f'{cache_path}.{os.getpid()}.tmp.npz'
+                np.savez(temp_path, key=np.array(key), vectors=vectors)
+                os.replace(temp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"Could not persist embeddings to {cache_path}: {e}")
+    return EmbeddingIndex(vectors, encoder)
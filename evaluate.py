@@ -0,0 +1,238 @@
+# Answer-quality evaluation: accuracy, fallback rate and throughput per matcher configuration
+# Usage:
+#   python evaluate.py bootstrap labels.jsonl              # label high-confidence chat_logs queries
+#   python evaluate.py run labels.jsonl                    # compare the built-in configurations
+#   python evaluate.py run labels.jsonl --config current --config fast=MATCH_BUDGET_MS=5,CATEGORY_FIRST=1
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# name -> environment overrides read by CollegeChatbot; "reference" is special-cased
+# to the original exhaustive calculate_similarity scan
+CONFIGS = {
+    'reference': {},
+    'current': {},
+    'no-category-first': {'CATEGORY_FIRST': '0'},
+    'no-spelling': {'SPELLING_MAX_DISTANCE': '0'},
+    'no-normalization': {'NORMALIZATION': ''},
+    'embeddings': {'EMBEDDINGS': '1'},
+}
+DEFAULT_CONFIGS = ['reference', 'current', 'no-category-first', 'no-spelling', 'no-normalization']
+CONFIDENCE_THRESHOLD = 0.3
+
+
+def load_labels(path: str) -> List[Tuple[str, Optional[int]]]:
+    """Read (query, faq_id) pairs from JSONL or CSV; an empty faq_id means "should fall back" """
+    labels = []
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(f):
+                faq_id = (row.get('faq_id') or '').strip()
+                labels.append((row['query'], int(faq_id) if faq_id else None))
+        else:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    labels.append((item['query'], item.get('faq_id')))
+    return labels
+
+
+def bootstrap_labels(db_path: str, output: str, min_confidence: float = 0.6, limit: int = 1000,
+                     log_db_path: Optional[str] = None) -> int:
+    """Label logged queries with the FAQ whose answer was given, when the bot was confident"""
+    faq_conn = sqlite3.connect(db_path)
+    answers = {}
+    for faq_id, answer in faq_conn.execute('SELECT id, answer FROM faqs ORDER BY id'):
+        answers.setdefault(answer, faq_id)
+    faq_conn.close()
+
+    conn = sqlite3.connect(log_db_path or db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT user_query, bot_response FROM chat_logs
+        WHERE confidence_score >= ?
+        ORDER BY id DESC
+    ''', (min_confidence,))
+
+    seen = set()
+    written = 0
+    with open(output, 'w', encoding='utf-8') as f:
+        for user_query, bot_response in cursor:
+            key = ' '.join(user_query.lower().split())
+            faq_id = answers.get(bot_response)
+            if faq_id is None or key in seen:
+                continue
+            seen.add(key)
+            f.write(json.dumps({'query': user_query, 'faq_id': faq_id}) + '\n')
+            written += 1
+            if written >= limit:
+                break
+    conn.close()
+    return written
+
+
+@contextmanager
+def patched_env(overrides: Dict[str, str]):
+    """Temporarily set environment variables"""
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def parse_config(spec: str) -> Tuple[str, Dict[str, str]]:
+    """``name`` for a built-in configuration, or ``name=VAR=value,VAR=value``"""
+    name, _, settings = spec.partition('=')
+    if not settings:
+        if name not in CONFIGS:
+            raise SystemExit(f"❌ Unknown configuration {name!r}; built in: {', '.join(CONFIGS)}")
+        return name, CONFIGS[name]
+    overrides = {}
+    for setting in settings.split(','):
+        variable, _, value = setting.partition('=')
+        overrides[variable.strip()] = value.strip()
+    return name, overrides
+
+
+def make_matcher(name: str, overrides: Dict[str, str], db_path: str, k: int, answer_cache: bool = False):
+    """A function query -> ranked matches for one configuration"""
+    from college_chatbot import CollegeChatbot
+    with patched_env(overrides):
+        # With the answer cache on, every pass after the first measures cache lookups, not scoring
+        bot = CollegeChatbot(db_path, async_logging=False, warm=False,
+                             answer_cache_size=None if answer_cache else 0)
+
+    if name != 'reference':
+        return lambda query: bot.find_top_answers(query, k)
+
+    def reference(query: str) -> List[Dict]:
+        scored = [
+            (bot.calculate_similarity(query, question, keywords), -position)
+            for position, (_, _, question, _, keywords) in enumerate(bot.faqs)
+        ]
+        return [
+            {'faq_id': bot.faqs[-neg][0], 'confidence': score}
+            for score, neg in sorted(scored, reverse=True)[:k]
+        ] if query.strip() else []
+    return reference
+
+
+def evaluate(matcher, labels: List[Tuple[str, Optional[int]]], k: int, repeat: int = 1) -> Dict:
+    """Accuracy from the first pass, latency over all passes"""
+    answered = []
+    correct_top1 = correct_topk = fallbacks = rejected_ok = 0
+    latencies = []
+    for run in range(repeat):
+        for query, faq_id in labels:
+            start = time.perf_counter()
+            matches = matcher(query)
+            latencies.append(time.perf_counter() - start)
+            if run:
+                continue
+
+            confident = bool(matches) and matches[0]['confidence'] >= CONFIDENCE_THRESHOLD
+            answered.append(matches[0]['faq_id'] if confident else None)
+            if not confident:
+                fallbacks += 1
+            if faq_id is None:
+                rejected_ok += not confident
+            else:
+                correct_top1 += confident and matches[0]['faq_id'] == faq_id
+                correct_topk += any(match['faq_id'] == faq_id for match in matches[:k])
+
+    in_scope = sum(1 for _, faq_id in labels if faq_id is not None)
+    out_of_scope = len(labels) - in_scope
+    return {
+        'top1': correct_top1 / max(in_scope, 1),
+        'topk': correct_topk / max(in_scope, 1),
+        'fallback_rate': fallbacks / max(len(labels), 1),
+        'out_of_scope_ok': rejected_ok / out_of_scope if out_of_scope else None,
+        'qps': len(latencies) / max(sum(latencies), 1e-9),
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+        'p95_ms': sorted(latencies)[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+        'answers': answered,
+    }
+
+
+def print_table(results: List[Tuple[str, Dict]], k: int):
+    """Side-by-side comparison; "changed" counts top-1 answers differing from the first configuration"""
+    baseline = results[0][1]['answers']
+    print(f"{'config':<20} {'top-1':>7} {f'top-{k}':>7} {'fallback':>9} {'oos ok':>7} "
+          f"{'changed':>8} {'q/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, result in results:
+        changed = sum(a != b for a, b in zip(baseline, result['answers']))
+        oos = '-' if result['out_of_scope_ok'] is None else f"{result['out_of_scope_ok']:.1%}"
+        print(f"{name:<20} {result['top1']:>7.1%} {result['topk']:>7.1%} {result['fallback_rate']:>9.1%} "
+              f"{oos:>7} {changed:>8} {result['qps']:>9.0f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate answer quality of matcher configurations")
+    parser.add_argument('--db', default=os.getenv('COLLEGE_FAQ_DB', 'college_faq.db'), help="FAQ database")
+    parser.add_argument('--log-db', default=os.getenv('CHAT_LOG_DB'),
+                        help="chat log database (default: $CHAT_LOG_DB, else the FAQ database)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    bootstrap = commands.add_parser('bootstrap', help="build a labelled file from confident chat_logs entries")
+    bootstrap.add_argument('output', help="JSONL file to write")
+    bootstrap.add_argument('--min-confidence', type=float, default=0.6)
+    bootstrap.add_argument('--limit', type=int, default=1000)
+
+    run = commands.add_parser('run', help="score configurations against a labelled file")
+    run.add_argument('labels', help="JSONL ({\"query\", \"faq_id\"}) or CSV (query,faq_id) file")
+    run.add_argument('--config', action='append', dest='configs',
+                     help="built-in name or name=VAR=value,... (repeatable; first one is the baseline)")
+    run.add_argument('-k', type=int, default=3, help="k for top-k accuracy")
+    run.add_argument('--repeat', type=int, default=3, help="passes over the queries for throughput")
+    run.add_argument('--answer-cache', action='store_true',
+                     help="keep the answer cache on (repeat passes then measure cache hits, not scoring)")
+    run.add_argument('--max-drop', type=float, default=None,
+                     help="exit with status 1 if any configuration's top-1 falls more than this below the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the evaluation CLI"""
+    args = parse_args(argv)
+    if args.command == 'bootstrap':
+        written = bootstrap_labels(args.db, args.output, args.min_confidence, args.limit, args.log_db)
+        print(f"✅ Wrote {written} labelled queries to {args.output}")
+        print("💡 Review them, and add queries with an empty faq_id that should get the fallback answer")
+        return
+
+    # The app module builds its own chatbot on import; point it at the same database
+    os.environ.setdefault('COLLEGE_FAQ_DB', args.db)
+    labels = load_labels(args.labels)
+    print(f"📋 {len(labels)} labelled queries from {args.labels}")
+    results = []
+    for spec in args.configs or DEFAULT_CONFIGS:
+        name, overrides = parse_config(spec)
+        matcher = make_matcher(name, overrides, args.db, args.k, args.answer_cache)
+        results.append((name, evaluate(matcher, labels, args.k, args.repeat)))
+    print_table(results, args.k)
+
+    if args.max_drop is not None:
+        baseline = results[0][1]['top1']
+        failing = [name for name, result in results if result['top1'] < baseline - args.max_drop]
+        if failing:
+            print(f"❌ Top-1 accuracy dropped below baseline for: {', '.join(failing)}")
+            sys.exit(1)
+        print("✅ Accuracy holds for every configuration")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+# Bulk FAQ import/export (CSV or JSON Lines), shared by the CLI below and the web app
+# Usage:
+#   python faq_io.py import faqs.csv                  # upsert by (category, question)
+#   python faq_io.py export faqs.jsonl                # or "-" for stdout
+# An import stamps the new FAQ version into the database (and announces it on a shared CACHE_BACKEND);
+# every server worker reading that database reloads within CACHE_SYNC_INTERVAL seconds.
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from cache_backend import faq_version_key, get_backend
+
+FIELDS = ('category', 'question', 'answer', 'keywords')
+MAX_LENGTHS = {'category': 100, 'question': 1000, 'answer': 20000, 'keywords': 2000}
+MAX_REPORTED_ERRORS = 50
+
+
+class FAQImportError(Exception):
+    """The import could not run at all (bad format, duplicate rows already in the table)"""
+
+
+def faq_version(faqs: List[Tuple]) -> str:
+    """Short content hash of (id, category, question, answer, keywords) rows in id order"""
+    digest = hashlib.sha1()
+    for row in faqs:
+        digest.update(repr(tuple(row)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+# faq_meta key holding the version of the FAQs last written through faq_io or the import endpoint
+FAQ_VERSION_STAMP = 'faq_version'
+
+
+class FAQStamp:
+    """Key/value rows in the FAQ database's faq_meta table; the VersionWatcher backend that lets every
+    worker reading one database file notice an import, whatever the cache backend"""
+
+    def __init__(self, db_path: str, connect: Callable[[], sqlite3.Connection] = None):
+        self.db_path = db_path
+        self.connect = connect or (lambda: sqlite3.connect(db_path))
+
+    def get(self, key: str) -> Optional[str]:
+        """Stamped value, or None if nothing was stamped yet"""
+        conn = self.connect()
+        try:
+            row = conn.execute('SELECT value FROM faq_meta WHERE key = ?', (key,)).fetchone()
+        except sqlite3.OperationalError:
+            # A database from before faq_meta existed
+            return None
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str):
+        """Stamp a value (always through a writable connection)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS faq_meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('INSERT OR REPLACE INTO faq_meta (key, value) VALUES (?, ?)', (key, value))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def publish_faq_version(db_path: str) -> str:
+    """Stamp the database's current FAQ version into it, and announce it to servers sharing the cache backend"""
+    conn = sqlite3.connect(db_path)
+    try:
+        version = faq_version(conn.execute('SELECT id, category, question, answer, keywords FROM faqs ORDER BY id'))
+    finally:
+        conn.close()
+    FAQStamp(db_path).set(FAQ_VERSION_STAMP, version)
+    backend = get_backend()
+    if backend.shared:
+        backend.set(faq_version_key(db_path), version)
+    return version
+
+
+def ensure_unique_index(cursor):
+    """Upserts match FAQs on (category, question); existing duplicates must be resolved first"""
+    try:
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_faqs_category_question ON faqs (category, question)')
+    except sqlite3.IntegrityError:
+        raise FAQImportError(
+            "The faqs table has duplicate (category, question) rows; remove them before importing"
+        )
+
+
+def detect_format(name: Optional[str], content_type: Optional[str] = None) -> str:
+    """'csv' or 'jsonl' from an explicit format, file name or Content-Type"""
+    hint = (name or '').lower()
+    if hint in ('csv', 'jsonl'):
+        return hint
+    if hint.endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    if hint.endswith(('.jsonl', '.ndjson', '.json')) or 'json' in (content_type or ''):
+        return 'jsonl'
+    raise FAQImportError("Unknown format; use a .csv or .jsonl file or pass format=csv|jsonl")
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """(line number, record, error) for each row, reading the stream incrementally"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        missing = [field for field in FIELDS[:3] if field not in (reader.fieldnames or [])]
+        if missing:
+            raise FAQImportError(f"CSV header must include {', '.join(FIELDS)} (missing {', '.join(missing)})")
+        for record in reader:
+            yield reader.line_num, record, None
+    else:
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"invalid JSON ({e})"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "expected a JSON object"
+                continue
+            yield line_number, record, None
+
+
+def validate(record: Dict) -> Tuple[Optional[Tuple[str, str, str, str]], Optional[str]]:
+    """A (category, question, answer, keywords) row, or why the record was rejected"""
+    values = []
+    for field in FIELDS:
+        value = record.get(field)
+        if isinstance(value, list) and field == 'keywords':
+            value = ', '.join(str(item) for item in value)
+        value = '' if value is None else str(value).strip()
+        if not value and field != 'keywords':
+            return None, f"missing {field}"
+        if len(value) > MAX_LENGTHS[field]:
+            return None, f"{field} longer than {MAX_LENGTHS[field]} characters"
+        values.append(value)
+    return tuple(values), None
+
+
+def import_faqs(db_path: str, stream: TextIO, fmt: str, batch_size: int = 5000) -> Dict:
+    """Upsert FAQs from a stream, committing every ``batch_size`` rows.
+
+    Rows are matched on (category, question): new ones are inserted, existing
+    ones get the imported answer and keywords. Invalid rows are skipped and
+    reported. The caller rebuilds the matching index once afterwards.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    cursor = conn.cursor()
+    # Readers (and the chat log writer) keep going while a batch commits
+    cursor.execute('PRAGMA journal_mode=WAL')
+    ensure_unique_index(cursor)
+
+    result = {'rows': 0, 'upserted': 0, 'invalid': 0, 'errors': []}
+    batch = []
+
+    def write_batch():
+        cursor.execute('BEGIN')
+        try:
+            cursor.executemany('''
+                INSERT INTO faqs (category, question, answer, keywords) VALUES (?, ?, ?, ?)
+                ON CONFLICT (category, question) DO UPDATE SET answer = excluded.answer, keywords = excluded.keywords
+            ''', batch)
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        result['upserted'] += len(batch)
+        batch.clear()
+
+    try:
+        for line_number, record, error in iter_records(stream, fmt):
+            result['rows'] += 1
+            row = None
+            if error is None:
+                row, error = validate(record)
+            if error is not None:
+                result['invalid'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append(f"line {line_number}: {error}")
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                write_batch()
+        if batch:
+            write_batch()
+    finally:
+        conn.close()
+    return result
+
+
+def export_faqs(db_path: str, fmt: str, fetch_size: int = 1000) -> Iterator[str]:
+    """Yield the faqs table as CSV or JSON Lines, a chunk of rows at a time"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT category, question, answer, keywords FROM faqs ORDER BY id')
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(FIELDS)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                if fmt == 'csv':
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        conn.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export the FAQ table")
+    parser.add_argument('--db', default=os.getenv('COLLEGE_FAQ_DB', 'college_faq.db'), help="FAQ database")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importer = commands.add_parser('import', help="upsert FAQs from a CSV or JSONL file")
+    importer.add_argument('path', help="file to read, or - for stdin")
+    importer.add_argument('--format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    importer.add_argument('--batch-size', type=int, default=5000, help="rows per transaction")
+
+    exporter = commands.add_parser('export', help="write every FAQ as CSV or JSONL")
+    exporter.add_argument('path', help="file to write, or - for stdout")
+    exporter.add_argument('--format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the import/export CLI"""
+    args = parse_args(argv)
+    try:
+        fmt = detect_format(args.format or args.path)
+        if args.command == 'import':
+            stream = sys.stdin if args.path == '-' else open(args.path, newline='', encoding='utf-8-sig')
+            with stream:
+                result = import_faqs(args.db, stream, fmt, args.batch_size)
+            print(f"✅ Imported {result['upserted']} FAQs ({result['invalid']} invalid rows skipped)")
+            for error in result['errors']:
+                print(f"⚠️  {error}")
+            version = publish_faq_version(args.db)
+            print(f"📣 Stamped FAQ version {version}; running servers reload within CACHE_SYNC_INTERVAL seconds")
+        else:
+            stream = sys.stdout if args.path == '-' else open(args.path, 'w', newline='', encoding='utf-8')
+            with stream:
+                for chunk in export_faqs(args.db, fmt):
+                    stream.write(chunk)
+            if args.path != '-':
+                print(f"✅ Exported FAQs to {args.path}")
+    except FAQImportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
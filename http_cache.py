@@ -0,0 +1,95 @@
+# HTTP caching helpers shared by the Flask and ASGI apps
+# Optional: pip install brotli (adds a "br" variant to static assets)
+
+import gzip
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred order when a client accepts several encodings equally
+ENCODING_PREFERENCE = ['br', 'gzip', 'identity']
+
+
+def etag_matches(if_none_match: Optional[str], etags: List[str]) -> bool:
+    """Weak If-None-Match comparison against one or more current ETags"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    current = {etag[2:] if etag.startswith('W/') else etag for etag in etags}
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in current:
+            return True
+    return False
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Map each encoding named in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+class StaticAsset:
+    """An in-memory response body with precomputed ETags and compressed variants"""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str = 'public, max-age=300'):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:20]
+
+        # encoding -> (body, strong ETag); each variant needs its own strong ETag
+        self.variants = {'identity': (body, f'"{digest}"')}
+        self.variants['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+    def select_encoding(self, accept_encoding: Optional[str]) -> str:
+        """Pick the best variant the client accepts"""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get('*')
+        best, best_q = 'identity', 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in self.variants:
+                continue
+            q = accepted.get(encoding, wildcard if wildcard is not None else (1.0 if encoding == 'identity' else 0.0))
+            # Smaller variants win ties thanks to the preference order
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def respond(self, if_none_match: Optional[str], accept_encoding: Optional[str]) -> Tuple[int, bytes, Dict[str, str]]:
+        """Return (status, body, headers) for a GET, answering 304 when the client copy is current"""
+        encoding = self.select_encoding(accept_encoding)
+        body, etag = self.variants[encoding]
+        headers = {
+            'ETag': etag,
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if etag_matches(if_none_match, [etag]):
+            return 304, b'', headers
+
+        headers['Content-Type'] = self.content_type
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return 200, body, headers
@@ -0,0 +1,249 @@
+# Replay load generator: real chat_logs traffic against the web app or the chatbot itself
+# Usage:
+#   python loadgen.py --url http://localhost:5000 --speedup 10 --concurrency 32
+#   python loadgen.py --direct --speedup 0 --concurrency 4           # in-process, as fast as possible
+#   python loadgen.py --url http://localhost:5000 --sweep 1,2,4,8,16,32 --limit 2000
+# The web limiter allows 0.5 requests/s per IP; raise it for the run, e.g. RATE_LIMIT_WEB=100000,100000
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from log_export import CHANNEL_PREFIX
+
+
+def load_traffic(db_path: str, limit: int = None, since_id: int = 0,
+                 log_db_path: str = None) -> List[Tuple[float, str]]:
+    """(offset in seconds from the first message, query) pairs from chat_logs, oldest first.
+
+    Without logged traffic, the FAQ questions are used one second apart so the
+    tool still runs on a fresh database.
+    """
+    conn = sqlite3.connect(log_db_path or db_path)
+    cursor = conn.cursor()
+    query = 'SELECT user_query, timestamp FROM chat_logs WHERE id > ? ORDER BY id'
+    params = [since_id]
+    if limit:
+        query += ' LIMIT ?'
+        params.append(limit)
+    rows = cursor.execute(query, params).fetchall()
+    conn.close()
+    if not rows:
+        print("⚠️  chat_logs is empty; replaying the FAQ questions one second apart")
+        conn = sqlite3.connect(db_path)
+        questions = [row[0] for row in conn.execute('SELECT question FROM faqs ORDER BY id')]
+        conn.close()
+        return [(float(i), question) for i, question in enumerate(questions[:limit] if limit else questions)]
+
+    traffic = []
+    start = None
+    for user_query, timestamp in rows:
+        try:
+            moment = datetime.fromisoformat(str(timestamp)).timestamp()
+        except ValueError:
+            moment = start or 0.0
+        if start is None:
+            start = moment
+        # Clock changes can make logged times go backwards; never schedule into the past
+        offset = max(moment - start, traffic[-1][0] if traffic else 0.0)
+        # Replay what the user typed, not the bots' "[TG:<user>] " / "[WA:<number>] " tags
+        traffic.append((offset, CHANNEL_PREFIX.sub('', user_query or '')))
+    return traffic
+
+
+def http_target(base_url: str, timeout: float) -> Callable[[str], int]:
+    """Send one query to POST /chat, returning the HTTP status"""
+    url = base_url.rstrip('/') + '/chat'
+
+    def send(message: str) -> int:
+        body = json.dumps({'message': message}).encode('utf-8')
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return send
+
+
+def direct_target(db_path: str, answer_cache: bool = False) -> Callable[[str], int]:
+    """Answer queries in-process with CollegeChatbot (no HTTP, no logging)"""
+    from college_chatbot import CollegeChatbot
+    # Replayed traffic repeats itself (and --sweep replays it per level); measure scoring, not cache hits
+    bot = CollegeChatbot(db_path, async_logging=False, warm=False, answer_cache_size=None if answer_cache else 0)
+
+    def send(message: str) -> int:
+        bot.find_best_answer(message)
+        return 200
+    return send
+
+
+class Results:
+    """Thread-safe collection of per-request outcomes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.finished = self.started
+
+    def record(self, latency: float, status: int = None):
+        with self.lock:
+            self.latencies.append(latency)
+            if status is None:
+                self.errors += 1
+            else:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                if status >= 500:
+                    self.errors += 1
+            self.finished = time.perf_counter()
+
+    def summary(self) -> Dict:
+        """Counts, throughput and latency percentiles in milliseconds"""
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        elapsed = max(self.finished - self.started, 1e-9)
+
+        def percentile(p: float) -> float:
+            return latencies[min(int(count * p), count - 1)] * 1000 if count else 0.0
+
+        return {
+            'requests': count,
+            'throughput': count / elapsed,
+            'errors': self.errors,
+            'error_rate': self.errors / max(count, 1),
+            'throttled': self.statuses.get(429, 0),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': latencies[-1] * 1000 if count else 0.0,
+        }
+
+
+def replay(traffic: List[Tuple[float, str]], send: Callable[[str], int], concurrency: int,
+           speedup: float) -> Dict:
+    """Replay traffic with ``concurrency`` workers.
+
+    With ``speedup`` > 0 requests are released on the original schedule divided
+    by ``speedup`` (open loop), and latency is measured from the scheduled time,
+    so time spent waiting for a free worker counts. With 0, every worker sends
+    its next request as soon as the previous one returns (closed loop).
+    """
+    results = Results()
+
+    def run(scheduled: float, message: str):
+        try:
+            status = send(message)
+        except Exception:
+            status = None
+        results.record(time.perf_counter() - scheduled, status)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results.started = start
+        for offset, message in traffic:
+            if speedup > 0:
+                scheduled = start + offset / speedup
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = None
+            executor.submit(lambda s=scheduled, m=message: run(s or time.perf_counter(), m))
+    return results.summary()
+
+
+def find_saturation(rows: List[Tuple[int, Dict]], min_gain: float = 0.1, max_error_rate: float = 0.01):
+    """First concurrency where adding workers stops paying: errors appear, or throughput
+    grows less than ``min_gain`` while p95 latency still rises"""
+    for (_, previous), (concurrency, current) in zip(rows, rows[1:]):
+        if current['error_rate'] > max_error_rate:
+            return concurrency
+        if current['throughput'] < previous['throughput'] * (1 + min_gain) and current['p95_ms'] > previous['p95_ms']:
+            return concurrency
+    return None
+
+
+def print_row(label, summary: Dict):
+    print(f"{label:>11} {summary['requests']:>9} {summary['throughput']:>9.1f} {summary['p50_ms']:>8.1f} "
+          f"{summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f} {summary['max_ms']:>8.1f} "
+          f"{summary['error_rate']:>7.2%} {summary['throttled']:>9}")
+
+
+def print_header():
+    print(f"{'concurrency':>11} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'errors':>7} {'throttled':>9}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay chat_logs traffic and measure latency")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="base URL of a running web app (POST <url>/chat)")
+    target.add_argument('--direct', action='store_true', help="call CollegeChatbot in this process")
+    parser.add_argument('--db', default=os.getenv('COLLEGE_FAQ_DB', 'college_faq.db'),
+                        help="FAQ database (for --direct, and for replaying FAQ questions without logs)")
+    parser.add_argument('--log-db', default=os.getenv('CHAT_LOG_DB'),
+                        help="database holding chat_logs (default: $CHAT_LOG_DB, else --db)")
+    parser.add_argument('--limit', type=int, default=None, help="replay at most this many messages")
+    parser.add_argument('--since-id', type=int, default=0, help="only replay chat_logs rows after this id")
+    parser.add_argument('--speedup', type=float, default=1.0,
+                        help="compress the original pacing N times; 0 sends as fast as workers allow")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent in-flight requests")
+    parser.add_argument('--sweep', help="comma separated concurrency levels to find the saturation point "
+                                        "(closed loop, ignores --speedup)")
+    parser.add_argument('--timeout', type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument('--answer-cache', action='store_true',
+                        help="keep the answer cache on for --direct (for --url, start the server with "
+                             "ANSWER_CACHE_SIZE=0 to measure uncached scoring)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the load generator CLI"""
+    args = parse_args(argv)
+    traffic = load_traffic(args.db, args.limit, args.since_id, args.log_db)
+    if not traffic:
+        print("❌ Nothing to replay")
+        return
+    send = http_target(args.url, args.timeout) if args.url else direct_target(args.db, args.answer_cache)
+    target = args.url or f"CollegeChatbot({args.db})"
+    print(f"🚀 Replaying {len(traffic)} messages against {target}")
+
+    if args.sweep:
+        rows = []
+        print_header()
+        for concurrency in [int(level) for level in args.sweep.split(',')]:
+            summary = replay(traffic, send, concurrency, speedup=0)
+            rows.append((concurrency, summary))
+            print_row(concurrency, summary)
+        saturation = find_saturation(rows)
+        if saturation:
+            print(f"📈 Saturates at concurrency {saturation} "
+                  f"(best throughput {max(row[1]['throughput'] for row in rows):.1f} req/s)")
+        else:
+            print("📈 No saturation within the tested levels; try higher concurrency")
+        return
+
+    span = traffic[-1][0] / args.speedup if args.speedup > 0 else 0
+    if span:
+        print(f"⏱️  Original span {traffic[-1][0]:.0f}s, replaying over ~{span:.0f}s")
+    summary = replay(traffic, send, args.concurrency, args.speedup)
+    print_header()
+    print_row(args.concurrency, summary)
+    if summary['throttled']:
+        print("⚠️  Requests were rate limited; raise RATE_LIMIT_WEB on the server for load tests")
+
+
+if __name__ == '__main__':
+    main()
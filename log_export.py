@@ -0,0 +1,143 @@
+# Streaming chat log export (NDJSON or CSV) with keyset pagination, for warehouse loads
+# Usage:
+#   python log_export.py logs.ndjson --since-id 120000
+#   python log_export.py logs.csv --state-file .last_log_id     # incremental: resumes after the last export
+#   curl -H "Authorization: Bearer $FAQ_ADMIN_TOKEN" "http://localhost:5000/api/logs?since_id=120000"
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+from typing import Iterator, Optional
+
+LOG_FIELDS = ('id', 'user_query', 'bot_response', 'confidence_score', 'timestamp')
+
+# "[TG:<user>] " / "[WA:<number>] " in front of chat_logs queries from the Telegram and WhatsApp bots
+CHANNEL_PREFIX = re.compile(r'^\[(?:TG|WA):[^\]]*\]\s*')
+
+
+def export_bounds(db_path: str, since_id: int = 0, since_time: Optional[str] = None,
+                  limit: Optional[int] = None) -> tuple:
+    """(first id - 1, last id) of the rows to export.
+
+    The upper bound is fixed before streaming starts, so an export is a
+    consistent snapshot that ends even while new logs keep arriving, and the
+    caller knows the id to resume from next time.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        if since_time:
+            # timestamp is indexed; jump straight to the first row at or after it
+            cursor.execute('SELECT MIN(id) FROM chat_logs WHERE timestamp >= ?', (since_time,))
+            first = cursor.fetchone()[0]
+            if first is None:
+                # Nothing that recent yet: start after the newest row, so the
+                # returned bound is a real id to resume from
+                cursor.execute('SELECT MAX(id) FROM chat_logs')
+                first = (cursor.fetchone()[0] or 0) + 1
+            since_id = max(since_id, first - 1)
+        if limit:
+            cursor.execute('''
+                SELECT MAX(id) FROM (SELECT id FROM chat_logs WHERE id > ? ORDER BY id LIMIT ?)
+            ''', (since_id, limit))
+        else:
+            cursor.execute('SELECT MAX(id) FROM chat_logs WHERE id > ?', (since_id,))
+        until_id = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    return since_id, until_id if until_id is not None else since_id
+
+
+def iter_log_pages(db_path: str, since_id: int, until_id: int, page_size: int = 1000) -> Iterator[list]:
+    """Rows with since_id < id <= until_id, one page at a time.
+
+    Each page is its own short query seeking past the last id seen (no
+    OFFSET), so memory stays constant and no read transaction is held open
+    between pages to hold back the log writer.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        last_id = since_id
+        while last_id < until_id:
+            cursor.execute('''
+                SELECT id, user_query, bot_response, confidence_score, timestamp FROM chat_logs
+                WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+            ''', (last_id, until_id, page_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield rows
+    finally:
+        conn.close()
+
+
+def export_logs(db_path: str, fmt: str, since_id: int, until_id: int, page_size: int = 1000) -> Iterator[str]:
+    """Yield chat logs as NDJSON or CSV text, one chunk per page"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(LOG_FIELDS)
+    for rows in iter_log_pages(db_path, since_id, until_id, page_size):
+        for row in rows:
+            if fmt == 'csv':
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(LOG_FIELDS, row)), ensure_ascii=False) + '\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export chat_logs as NDJSON or CSV")
+    parser.add_argument('path', help="file to write (.ndjson/.jsonl or .csv), or - for stdout")
+    parser.add_argument('--db', default=os.getenv('CHAT_LOG_DB') or os.getenv('COLLEGE_FAQ_DB', 'college_faq.db'),
+                        help="database with chat_logs (default: $CHAT_LOG_DB, else the FAQ database)")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], help="default: from the file extension")
+    parser.add_argument('--since-id', type=int, default=0, help="only rows after this id")
+    parser.add_argument('--since', help="only rows logged at or after this time (YYYY-MM-DD HH:MM:SS, UTC)")
+    parser.add_argument('--limit', type=int, help="at most this many rows")
+    parser.add_argument('--state-file', help="read --since-id from this file and store the last exported id in it")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the log export CLI"""
+    args = parse_args(argv)
+    fmt = args.format or ('csv' if args.path.endswith('.csv') else 'ndjson')
+    since_id = args.since_id
+    if args.state_file and os.path.exists(args.state_file):
+        with open(args.state_file) as f:
+            since_id = max(since_id, int(f.read().strip() or 0))
+
+    since_id, until_id = export_bounds(args.db, since_id, args.since, args.limit)
+    stream = sys.stdout if args.path == '-' else open(args.path, 'w', newline='', encoding='utf-8')
+    try:
+        for chunk in export_logs(args.db, fmt, since_id, until_id):
+            stream.write(chunk)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    if args.state_file and until_id > since_id:
+        # Write then rename, so an interrupted run never leaves a half-written id
+        temp_path = f'{args.state_file}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(str(until_id))
+        os.replace(temp_path, args.state_file)
+    if args.path != '-':
+        print(f"✅ Exported chat logs {since_id + 1}..{until_id} to {args.path}" if until_id > since_id
+              else "✅ No new chat logs")
+
+
+if __name__ == '__main__':
+    main()
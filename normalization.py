@@ -0,0 +1,107 @@
+# Term normalization for keyword matching: synonyms, light stemming, stopwords
+
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be been before being but by can could did do does doing for
+from had has have having how i if in into is it its me my of on or our please should so than that the their
+them then there these they this those to was we were what when where which who why will with would you your
+""".split())
+
+# Seeded into the synonyms table the first time the database is created
+DEFAULT_SYNONYMS = [
+    ('dorm', 'housing'), ('dorms', 'housing'), ('residence', 'housing'), ('accommodation', 'housing'),
+    ('enroll', 'register'), ('enrol', 'register'), ('enrollment', 'register'), ('enrolment', 'register'),
+    ('signup', 'register'),
+    ('internet', 'wifi'), ('wireless', 'wifi'),
+    ('cost', 'fee'), ('price', 'fee'),
+    ('food', 'dining'), ('cafeteria', 'dining'), ('eat', 'dining'),
+    ('login', 'portal'),
+]
+
+# (suffix, replacement), tried in order; applied repeatedly so that
+# "registering" -> "register" -> "regist" and "registration" -> "register" -> "regist"
+SUFFIX_RULES = [
+    ('ational', 'ate'),
+    ('ration', 'er'),
+    ('ation', 'er'),
+    ('ies', 'y'),
+    ('ing', ''),
+    ('ed', ''),
+    ('er', ''),
+    ('es', ''),
+    ('s', ''),
+    ('e', ''),
+]
+MIN_STEM_LENGTH = 3
+
+
+def light_stem(word: str) -> str:
+    """Strip common English inflections so word forms share one term"""
+    for _ in range(3):
+        for suffix, replacement in SUFFIX_RULES:
+            if not word.endswith(suffix) or (suffix == 's' and word.endswith('ss')):
+                continue
+            stem = word[:-len(suffix)] + replacement
+            if len(stem) >= MIN_STEM_LENGTH:
+                word = stem
+                break
+        else:
+            return word
+    return word
+
+
+class Normalizer:
+    """Map words to matching terms, once per distinct word.
+
+    The same instance normalizes FAQ keywords when the index is built and
+    query words per request, and remembers every word it has seen, so hot
+    words cost a single dictionary lookup.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, str]] = None, stem: bool = True,
+                 stopwords: Iterable[str] = STOPWORDS, cache_size: int = 100000):
+        self.synonyms = synonyms or {}
+        self.stem = stem
+        self.stopwords = frozenset(stopwords)
+        self.cache_size = cache_size
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def term(self, word: str) -> Optional[str]:
+        """Matching term for ``word``, or None for a stopword"""
+        cached = self.cache.get(word, False)
+        if cached is not False:
+            return cached
+
+        term = None
+        if word not in self.stopwords:
+            term = self.synonyms.get(word, word)
+            if self.stem:
+                term = light_stem(term)
+
+        with self.lock:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[word] = term
+        return term
+
+    def terms(self, words: Iterable[str]) -> Set[str]:
+        """Matching terms for a set of words, without stopwords"""
+        terms = set()
+        for word in words:
+            term = self.term(word)
+            if term:
+                terms.add(term)
+        return terms
+
+
+def normalizer_from_settings(setting: str, synonyms: Dict[str, str]) -> Normalizer:
+    """Build a Normalizer from a comma separated list of steps (stem, synonyms, stopwords)"""
+    steps = {step.strip() for step in setting.split(',') if step.strip()}
+    return Normalizer(
+        synonyms=synonyms if 'synonyms' in steps else None,
+        stem='stem' in steps,
+        stopwords=STOPWORDS if 'stopwords' in steps else (),
+    )
@@ -0,0 +1,113 @@
+# Per-client rate limiting for the web, Telegram and WhatsApp channels
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple
+
+# channel -> (tokens per second, burst size); override with RATE_LIMIT_<CHANNEL>="rate,burst"
+DEFAULT_LIMITS = {
+    'web': (0.5, 10),
+    'telegram': (0.5, 8),
+    'whatsapp': (0.25, 5),
+}
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    retry_after: float      # seconds until the next token, 0 when allowed
+    rejected_in_row: int    # consecutive rejections, so callers can notify only once
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by client id (IP, Telegram user id, phone number).
+
+    Buckets are kept in LRU order. A bucket idle for ``burst / rate``
+    seconds has refilled completely and is indistinguishable from a new
+    one, so it is dropped; ``max_keys`` caps memory even under a flood of
+    distinct keys.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_ttl = burst / rate
+        # key -> [tokens, last_refill, rejected_in_row]
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self.allowed_count = 0
+        self.throttled_count = 0
+        self.evicted_count = 0
+
+    def allow(self, key) -> RateLimitDecision:
+        """Take one token for ``key`` if available"""
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [self.burst, now, 0]
+                if len(self.buckets) > self.max_keys:
+                    self.buckets.popitem(last=False)
+                    self.evicted_count += 1
+            else:
+                self.buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                bucket[2] = 0
+                self.allowed_count += 1
+                return RateLimitDecision(True, 0.0, 0)
+
+            bucket[2] += 1
+            self.throttled_count += 1
+            return RateLimitDecision(False, (1 - bucket[0]) / self.rate, bucket[2])
+
+    def _expire(self, now: float):
+        # Oldest-touched buckets sit at the front; stop at the first live one
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if now - bucket[1] < self.idle_ttl:
+                break
+            del self.buckets[key]
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        with self.lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'allowed': self.allowed_count,
+                'throttled': self.throttled_count,
+                'tracked_clients': len(self.buckets),
+                'evicted': self.evicted_count,
+            }
+
+
+def limiter_from_env(channel: str) -> TokenBucketLimiter:
+    """Build a channel's limiter from RATE_LIMIT_<CHANNEL> or the defaults"""
+    rate, burst = DEFAULT_LIMITS[channel]
+    setting = os.getenv(f'RATE_LIMIT_{channel.upper()}')
+    if setting:
+        rate_text, _, burst_text = setting.partition(',')
+        rate = float(rate_text)
+        burst = float(burst_text or burst)
+    max_keys = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '100000'))
+    return TokenBucketLimiter(rate, burst, max_keys=max_keys)
+
+
+limiters = {channel: limiter_from_env(channel) for channel in DEFAULT_LIMITS}
+
+
+def check_rate_limit(channel: str, key) -> RateLimitDecision:
+    """Consume one request for ``key`` on ``channel``"""
+    return limiters[channel].allow(key)
+
+
+def rate_limit_stats() -> Dict:
+    """Per-channel limiter counters"""
+    return {channel: limiter.stats() for channel, limiter in limiters.items()}
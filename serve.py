@@ -0,0 +1,162 @@
+# Production server for the College Helpdesk web app
+# Install: pip install gunicorn
+
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+
+
+def default_workers() -> int:
+    """Gunicorn's recommended worker count for CPU-bound scoring"""
+    return int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+
+def parse_args(argv=None):
+    """Parse command line options, falling back to environment variables"""
+    parser = argparse.ArgumentParser(description="Serve the College Helpdesk web app")
+    parser.add_argument('--bind', default=os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}"),
+                        help="address to listen on (default: 0.0.0.0:$PORT)")
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help="worker processes (default: $WEB_CONCURRENCY or 2 x CPUs + 1)")
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', '4')),
+                        help="threads per worker (default: $WEB_THREADS or 4)")
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('WEB_TIMEOUT', '30')),
+                        help="seconds before a silent worker is restarted")
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30')),
+                        help="seconds workers get to finish requests and flush logs on shutdown")
+    parser.add_argument('--asgi', action='store_true',
+                        help="serve the async app (asgi_app.py) on uvicorn workers for many concurrent connections")
+    parser.add_argument('--telegram-webhook', action='store_true',
+                        help="also receive Telegram updates at $TELEGRAM_WEBHOOK_URL's path (shares the FAQ index)")
+    parser.add_argument('--whatsapp-webhook', action='store_true',
+                        help="also answer Twilio WhatsApp messages at /whatsapp-webhook (shares the FAQ index)")
+    parser.add_argument('--dev', action='store_true',
+                        help="run Flask's debug server instead (single process, auto-reload)")
+    return parser.parse_args(argv)
+
+
+def on_pre_fork(server, worker):
+    """Gunicorn hook: runs in the master before each worker is forked"""
+    # Move the preloaded FAQ index out of the collector's generations so
+    # workers don't touch (and copy) those pages on their first GC pass
+    gc.freeze()
+
+
+def on_worker_exit(server, worker):
+    """Gunicorn hook: flush queued chat logs before a worker exits"""
+    from college_chatbot import chatbot, tenants
+    chatbot.close()
+    if tenants is not None:
+        tenants.close()
+
+
+def attach_webhooks(app, args):
+    """Mount the bot webhooks selected on the command line onto the Flask app"""
+    if args.telegram_webhook:
+        from telegram_bot import attach_telegram_webhook
+        attach_telegram_webhook(app)
+    if args.whatsapp_webhook:
+        from telegram_bot import attach_whatsapp_webhook
+        attach_whatsapp_webhook(app)
+
+
+def run_gunicorn(args):
+    """Run the Flask app under gunicorn's threaded workers, or the ASGI app under uvicorn workers"""
+    from gunicorn.app.base import BaseApplication
+
+    class HelpdeskApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if args.asgi:
+                from asgi_app import app
+            else:
+                from college_chatbot import app
+                # Mounted in the master (preload_app), before workers fork
+                attach_webhooks(app, args)
+            return app
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'uvicorn.workers.UvicornWorker' if args.asgi else 'gthread',
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        # Load the FAQ index once in the master and share it with workers via fork
+        'preload_app': True,
+        'pre_fork': on_pre_fork,
+        'worker_exit': on_worker_exit,
+        'accesslog': '-',
+    }
+    HelpdeskApplication(options).run()
+
+
+def main(argv=None):
+    """Start the web app"""
+    args = parse_args(argv)
+
+    print("🎓 College Helpdesk Chatbot Starting...")
+    host, _, port = args.bind.rpartition(':')
+    base_url = f"http://{'localhost' if host in ('', '0.0.0.0') else host}:{port}"
+    print(f"📱 Web Interface: {base_url}")
+    print(f"🔌 API Endpoint: {base_url}/chat")
+    print(f"📊 Statistics: {base_url}/api/stats")
+    print(f"📚 Categories: {base_url}/api/categories")
+    print(f"✅ Readiness: {base_url}/ready")
+
+    if os.getenv('TENANTS_CONFIG'):
+        if args.asgi:
+            print("❌ Tenants (TENANTS_CONFIG) are routed by the Flask app; drop --asgi")
+            sys.exit(1)
+        print(f"🏫 Tenants: {os.getenv('TENANTS_CONFIG')} (loaded on first request)")
+
+    if args.telegram_webhook:
+        if args.asgi:
+            print("❌ --telegram-webhook is served by the Flask app; drop --asgi")
+            sys.exit(1)
+        print(f"🤖 Telegram webhook: {os.getenv('TELEGRAM_WEBHOOK_URL')}")
+
+    if args.whatsapp_webhook:
+        if args.asgi:
+            print("❌ --whatsapp-webhook is served by the Flask app; drop --asgi")
+            sys.exit(1)
+        missing = [name for name in ('TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'WHATSAPP_NUMBER') if not os.getenv(name)]
+        if missing:
+            print(f"❌ --whatsapp-webhook needs {', '.join(missing)}")
+            sys.exit(1)
+        print(f"📱 WhatsApp webhook: {os.getenv('WHATSAPP_WEBHOOK_URL') or base_url + '/whatsapp-webhook'}")
+
+    if args.dev:
+        from college_chatbot import app
+        attach_webhooks(app, args)
+        app.run(debug=True, host=host or '0.0.0.0', port=int(port))
+        return
+
+    try:
+        import gunicorn  # noqa: F401
+        if args.asgi:
+            import uvicorn  # noqa: F401
+            import starlette  # noqa: F401
+    except ImportError as e:
+        print(f"❌ {e.name} is not installed. Install it with: pip install {e.name}")
+        print("💡 Or use the development server: python serve.py --dev")
+        sys.exit(1)
+
+    if args.asgi:
+        print(f"⚙️  {args.workers} async workers")
+    else:
+        print(f"⚙️  {args.workers} workers x {args.threads} threads")
+    run_gunicorn(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Per-user conversation context for follow-up questions
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class SessionStore:
+    """Last matched FAQ per user, with LRU + TTL eviction.
+
+    Keys are channel-prefixed user ids (``tg:<chat id>``, ``wa:<number>``,
+    ``web:<session cookie>``). Each entry is a small dict, so ``max_sessions``
+    puts a fixed ceiling on memory no matter how many users show up.
+    """
+
+    def __init__(self, max_sessions: int = 50000, ttl: float = 900):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # key -> (expires_at, context)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Context for ``key`` if it has not expired"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, context: Dict):
+        """Store context for ``key``, refreshing its TTL"""
+        now = time.monotonic()
+        with self.lock:
+            self.entries[key] = (now + self.ttl, context)
+            self.entries.move_to_end(key)
+            # Every set pushes the newest entry to the back, so expired ones collect at the front
+            while self.entries:
+                oldest_key, (expires_at, _) = next(iter(self.entries.items()))
+                if expires_at > now and len(self.entries) <= self.max_sessions:
+                    break
+                del self.entries[oldest_key]
+                if expires_at > now:
+                    self.evicted += 1
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        with self.lock:
+            return {
+                'active': len(self.entries),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+            }
@@ -0,0 +1,97 @@
+# Typo-tolerant token lookup over the FAQ vocabulary (SymSpell-style deletes)
+
+import threading
+from typing import Dict, Optional, Set
+
+
+def deletes(word: str, max_distance: int) -> Set[str]:
+    """Every string reachable from ``word`` by removing up to ``max_distance`` characters"""
+    results = set()
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count as one edit), or limit + 1 if larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SpellingIndex:
+    """Map misspelled query tokens to FAQ vocabulary tokens.
+
+    Deletes of every vocabulary word are precomputed, so a lookup only
+    generates the deletes of the query token and checks the few candidates
+    sharing one, instead of comparing against the whole vocabulary.
+    """
+
+    def __init__(self, word_counts: Dict[str, int], max_distance: int = 2, min_length: int = 4,
+                 cache_size: int = 50000):
+        self.word_counts = word_counts
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.cache_size = cache_size
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.corrections = 0
+        # delete -> vocabulary words producing it
+        self.delete_index = {}
+        for word in word_counts:
+            if len(word) < self.min_length:
+                continue
+            for variant in deletes(word, self.allowed_distance(word)) | {word}:
+                self.delete_index.setdefault(variant, []).append(word)
+
+    def allowed_distance(self, word: str) -> int:
+        """Shorter words tolerate fewer edits before they turn into other words"""
+        return 1 if len(word) < 8 else self.max_distance
+
+    def correct(self, word: str) -> Optional[str]:
+        """Closest vocabulary word to ``word``, or None when nothing is close enough"""
+        if word in self.word_counts:
+            return word
+        if len(word) < self.min_length:
+            return None
+        cached = self.cache.get(word, False)
+        if cached is not False:
+            return cached
+
+        limit = self.allowed_distance(word)
+        best, best_key = None, None
+        for variant in deletes(word, limit) | {word}:
+            for candidate in self.delete_index.get(variant, ()):
+                distance = edit_distance(word, candidate, limit)
+                if distance > limit:
+                    continue
+                # Closest first, then the word used most in the FAQs
+                key = (distance, -self.word_counts[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+
+        with self.lock:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[word] = best
+            if best is not None:
+                self.corrections += 1
+        return best
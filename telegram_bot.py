@@ -2,15 +2,22 @@
 # Install: pip install python-telegram-bot
 
 import logging
-import sqlite3
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 import asyncio
+import functools
+import hashlib
+import math
 import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple, Union
 
-# Import our chatbot class
-from college_chatbot import CollegeChatbot
+# Import our chatbot class (and the quick_* questions it warms up at startup)
+from college_chatbot import QUICK_QUESTIONS, CollegeChatbot
+from rate_limit import check_rate_limit
 
 # Configure logging
 logging.basicConfig(
@@ -19,13 +26,131 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# The only update kinds with handlers; Telegram doesn't even send the rest
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# Confidence indicators, best first; see confidence_tier
+CONFIDENCE_EMOJI = ("🎯", "📍", "❓")
+
+# Telegram objects are immutable, so fixed keyboards are built once and shared
+QUICK_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📝 Admission Requirements", callback_data='quick_admission')],
+    [InlineKeyboardButton("💰 Financial Aid", callback_data='quick_financial')],
+    [InlineKeyboardButton("🏠 Housing Options", callback_data='quick_housing')],
+    [InlineKeyboardButton("📚 Library Hours", callback_data='quick_library')]
+])
+SUPPORT_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📞 Contact Support", url="tel:+15551234567")],
+    [InlineKeyboardButton("🌐 Visit Website", url="https://college.edu/help")],
+    [InlineKeyboardButton("📂 Browse Categories", callback_data="browse_categories")]
+])
+
+def confidence_tier(confidence: float) -> int:
+    """Index into CONFIDENCE_EMOJI: 0 above 0.7, 1 above 0.4, else 2"""
+    return 0 if confidence > 0.7 else 1 if confidence > 0.4 else 2
+
+def best_match(chatbot: CollegeChatbot, user_message: str, **kwargs) -> Tuple[Optional[int], str, float, str]:
+    """``find_best_answer`` plus the matched FAQ's id (None when the fallback reply is used)"""
+    if not user_message.strip():
+        return (None,) + chatbot.find_best_answer(user_message)
+    matches = chatbot.find_top_answers(user_message, 1, **kwargs)
+    response, confidence, category = chatbot.answer_from_matches(matches)
+    faq_id = matches[0]['faq_id'] if matches and confidence >= 0.3 else None
+    return faq_id, response, confidence, category
+
+class RenderedReplies:
+    """Channel-formatted payloads for the current FAQ version.
+    
+    ``build(chatbot)`` renders everything a channel sends verbatim (formatted
+    answers per FAQ and confidence tier, category listings, keyboards). It runs
+    once per FAQ version, so hot replies are dictionary lookups, and a reload
+    that changes any FAQ is picked up on the next reply. ``source()`` returns
+    the chatbot to render for; payloads are kept per chatbot instance and go
+    away with it when a tenant is evicted.
+    """
+    
+    def __init__(self, source: Callable[[], CollegeChatbot], build: Callable[[CollegeChatbot], Dict]):
+        self.source = source
+        self.build = build
+        self.lock = threading.Lock()
+        # chatbot -> (faq version, payloads), each value replaced as a whole
+        self._current = weakref.WeakKeyDictionary()
+        
+    def get(self) -> Dict:
+        """Payloads for the chatbot's current FAQ version"""
+        chatbot = self.source()
+        version, payloads = self._current.get(chatbot, (None, None))
+        if version != chatbot.faq_version:
+            with self.lock:
+                version, payloads = self._current.get(chatbot, (None, None))
+                if version != chatbot.faq_version:
+                    version = chatbot.faq_version
+                    payloads = self.build(chatbot)
+                    self._current[chatbot] = (version, payloads)
+        return payloads
+        
+    def answer(self, faq_id: Optional[int], response: str, confidence: float, category: str,
+               render: Callable[[str, float, str], str]) -> str:
+        """Pre-rendered answer, or ``render`` for one the cache doesn't know (e.g. mid-reload)"""
+        tier = confidence_tier(confidence)
+        payloads = self.get()
+        rendered = payloads['fallback'] if faq_id is None else payloads['answers'].get(faq_id)
+        if rendered is not None and rendered[0] == response:
+            return rendered[1][tier]
+        return render(response, confidence, category)
+
+def render_answers(chatbot: CollegeChatbot, render: Callable[[str, float, str], str]) -> Dict:
+    """Every FAQ answer and the fallback reply rendered at each confidence tier"""
+    # One representative confidence per tier
+    tiers = (1.0, 0.5, 0.0)
+    fallback_response, _, fallback_category = chatbot.answer_from_matches([])
+    return {
+        'answers': {
+            faq_id: (answer, [render(answer, confidence, category) for confidence in tiers])
+            for faq_id, category, question, answer, keywords in chatbot.faqs
+        },
+        'fallback': (fallback_response, [render(fallback_response, confidence, fallback_category) for confidence in tiers]),
+    }
+
+def tenant_webhook_secret(token: str, secret: Optional[str] = None) -> str:
+    """Webhook secret token identifying one tenant's bot on a shared webhook route"""
+    # Only Telegram and we know the bot token, so the derived secret also authenticates
+    return hashlib.sha256(f"{secret or ''}:{token}".encode('utf-8')).hexdigest()
+
 class TelegramCollegeBot:
-    def __init__(self, token: str):
+    def __init__(self, token: str, chatbot: Union[CollegeChatbot, Callable[[], CollegeChatbot]] = None,
+                 concurrent_updates: int = None, base_url: str = None):
         self.token = token
-        self.chatbot = CollegeChatbot()
-        self.application = Application.builder().token(token).build()
+        # A chatbot, or a function returning it for a tenant that is loaded on demand
+        self._chatbot = chatbot or CollegeChatbot()
+        # Updates handled at once; scoring runs on a pool of the same size so the
+        # event loop keeps receiving updates and sending replies meanwhile
+        if concurrent_updates is None:
+            concurrent_updates = int(os.getenv('TELEGRAM_CONCURRENT_UPDATES', '16'))
+        self.concurrent_updates = concurrent_updates
+        self.executor = ThreadPoolExecutor(max_workers=concurrent_updates, thread_name_prefix='telegram')
+        # Point at a local Bot API server (or a fake one in tests), e.g. http://localhost:8081/bot
+        self.base_url = base_url or os.getenv('TELEGRAM_API_URL')
+        builder = Application.builder().token(token).concurrent_updates(concurrent_updates)
+        if self.base_url:
+            builder = builder.base_url(self.base_url)
+        self.application = builder.build()
+        # Webhook mode: the Application runs on its own event loop thread, fed by HTTP requests
+        self.max_pending_updates = int(os.getenv('TELEGRAM_MAX_PENDING_UPDATES', '200'))
+        self._webhook_lock = threading.Lock()
+        self._loop = None
+        self._loop_pid = None
+        # Formatted answers, category listings, keyboards and quick replies per FAQ version
+        self.replies = RenderedReplies(lambda: self.chatbot, self.build_payloads)
+        if not callable(self._chatbot):
+            self.replies.get()
         self.setup_handlers()
         
+    @property
+    def chatbot(self) -> CollegeChatbot:
+        """The chatbot answering this bot's chats"""
+        return self._chatbot() if callable(self._chatbot) else self._chatbot
+        
     def setup_handlers(self):
         """Set up bot command and message handlers"""
         self.application.add_handler(CommandHandler("start", self.start))
@@ -58,15 +183,7 @@ I'm here to help you with all your college-related questions!
 🚀 **Quick Start:** Try asking "What are the admission requirements?"
         """
         
-        keyboard = [
-            [InlineKeyboardButton("📝 Admission Requirements", callback_data='quick_admission')],
-            [InlineKeyboardButton("💰 Financial Aid", callback_data='quick_financial')],
-            [InlineKeyboardButton("🏠 Housing Options", callback_data='quick_housing')],
-            [InlineKeyboardButton("📚 Library Hours", callback_data='quick_library')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(welcome_message, reply_markup=reply_markup, parse_mode='Markdown')
+        await update.message.reply_text(welcome_message, reply_markup=QUICK_KEYBOARD, parse_mode='Markdown')
         
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
@@ -94,24 +211,71 @@ I'm here to help you with all your college-related questions!
         
     async def categories(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show available categories"""
-        categories = self.chatbot.get_categories()
-        
-        keyboard = []
-        for category in categories:
-            keyboard.append([InlineKeyboardButton(f"📂 {category}", callback_data=f'category_{category}')])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         await update.message.reply_text(
             "📁 **Select a category to explore:**", 
-            reply_markup=reply_markup, 
+            reply_markup=self.category_keyboard(), 
             parse_mode='Markdown'
         )
         
+    def category_keyboard(self) -> InlineKeyboardMarkup:
+        """Inline keyboard with one button per FAQ category"""
+        return self.replies.get()['category_keyboard']
+        
+    def render_answer(self, response: str, confidence: float, category: str) -> str:
+        """Format a chatbot answer for Telegram"""
+        return f"{CONFIDENCE_EMOJI[confidence_tier(confidence)]} **{category}**\n\n{response}"
+        
+    def render_category_listing(self, category: str, faqs) -> str:
+        """First five FAQs of a category, answers truncated for Telegram"""
+        response_text = f"📂 **{category} FAQs:**\n\n"
+        for i, faq in enumerate(faqs[:5], 1):  # Limit to first 5 FAQs
+            response_text += f"**Q{i}:** {faq['question']}\n"
+            # Truncate long answers for Telegram
+            answer = faq['answer']
+            if len(answer) > 200:
+                answer = answer[:197] + "..."
+            response_text += f"**A:** {answer}\n\n"
+        
+        if len(faqs) > 5:
+            response_text += f"... and {len(faqs) - 5} more questions in this category.\n"
+            
+        response_text += "\n💬 **Ask me anything specific!**"
+        return response_text
+        
+    def build_payloads(self, chatbot: CollegeChatbot) -> Dict:
+        """Render every fixed Telegram reply for the current FAQs"""
+        payloads = render_answers(chatbot, self.render_answer)
+        categories = chatbot.get_categories()
+        payloads['category_keyboard'] = InlineKeyboardMarkup([
+            [InlineKeyboardButton(f"📂 {category}", callback_data=f'category_{category}')]
+            for category in categories
+        ])
+        payloads['listings'] = {
+            category: self.render_category_listing(category, chatbot.get_faqs_by_category(category))
+            for category in categories
+        }
+        # Quick questions are fixed, so their answers are too
+        payloads['quick'] = {}
+        for data, question in QUICK_QUESTIONS.items():
+            matches = chatbot.find_top_answers(question, 1)
+            response, confidence, category = chatbot.answer_from_matches(matches)
+            payloads['quick'][data] = (
+                question, matches[0] if matches else None, response, confidence,
+                self.render_answer(response, confidence, category)
+            )
+        return payloads
+        
+    async def find_best_answer(self, user_message: str, **kwargs):
+        """Score a message on the worker pool instead of the event loop; see ``best_match``"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(best_match, self.chatbot, user_message, **kwargs)
+        )
+        
     async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show bot statistics"""
         try:
-            conn = sqlite3.connect(self.chatbot.db_path)
+            conn = self.chatbot.log_connection()
             cursor = conn.cursor()
             
             # Get statistics
@@ -157,24 +321,21 @@ I'm here to help you with all your college-related questions!
         
         # Handle quick questions
         if data.startswith('quick_'):
-            question_map = {
-                'quick_admission': 'What are the admission requirements?',
-                'quick_financial': 'What financial aid is available?',
-                'quick_housing': 'What housing options are available?',
-                'quick_library': 'What are library hours?'
-            }
-            
-            question = question_map.get(data)
-            if question:
-                response, confidence, category = self.chatbot.find_best_answer(question)
-                
-                # Add confidence indicator
-                confidence_emoji = "🎯" if confidence > 0.7 else "📍" if confidence > 0.4 else "❓"
+            if not check_rate_limit('telegram', update.effective_user.id).allowed:
+                return
                 
-                await query.edit_message_text(
-                    f"{confidence_emoji} **{category}**\n\n{response}",
-                    parse_mode='Markdown'
-                )
+            quick = self.replies.get()['quick'].get(data)
+            if quick:
+                # Answered when the FAQs were loaded; no scoring pass needed
+                question, match, response, confidence, formatted_response = quick
+                if match and confidence >= 0.3:
+                    self.chatbot.sessions.set(f"tg:{update.effective_chat.id}", {
+                        'category': match['category'],
+                        'faq_id': match['faq_id'],
+                        'question': match['question']
+                    })
+                    
+                await query.edit_message_text(formatted_response, parse_mode='Markdown')
                 
                 # Log the conversation
                 self.chatbot.log_conversation(question, response, confidence)
@@ -182,27 +343,24 @@ I'm here to help you with all your college-related questions!
         # Handle category browsing
         elif data.startswith('category_'):
             category = data.replace('category_', '')
-            faqs = self.chatbot.get_faqs_by_category(category)
+            response_text = self.replies.get()['listings'].get(category)
             
-            if faqs:
-                response_text = f"📂 **{category} FAQs:**\n\n"
-                for i, faq in enumerate(faqs[:5], 1):  # Limit to first 5 FAQs
-                    response_text += f"**Q{i}:** {faq['question']}\n"
-                    # Truncate long answers for Telegram
-                    answer = faq['answer']
-                    if len(answer) > 200:
-                        answer = answer[:197] + "..."
-                    response_text += f"**A:** {answer}\n\n"
-                
-                if len(faqs) > 5:
-                    response_text += f"... and {len(faqs) - 5} more questions in this category.\n"
-                    
-                response_text += "\n💬 **Ask me anything specific!**"
+            if response_text:
+                # Score the user's next question against this category first
+                context.user_data['category'] = category
                 
                 await query.edit_message_text(response_text, parse_mode='Markdown')
             else:
                 await query.edit_message_text(f"No FAQs found for {category}")
                 
+        # "Browse Categories" button offered with low-confidence answers
+        elif data == 'browse_categories':
+            await query.message.reply_text(
+                "📁 **Select a category to explore:**",
+                reply_markup=self.category_keyboard(),
+                parse_mode='Markdown'
+            )
+                
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle user messages"""
         user_message = update.message.text
@@ -211,30 +369,31 @@ I'm here to help you with all your college-related questions!
         
         logger.info(f"User {username} ({user_id}): {user_message}")
         
+        decision = check_rate_limit('telegram', user_id)
+        if not decision.allowed:
+            # Tell the user once per burst; replying to every flooded message would cost API calls too
+            if decision.rejected_in_row == 1:
+                await update.message.reply_text(
+                    f"⏳ You're sending messages too quickly. Please wait {math.ceil(decision.retry_after)}s and try again."
+                )
+            return
+            
         # Show typing indicator
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
         
         try:
             # Get response from chatbot
-            response, confidence, category = self.chatbot.find_best_answer(user_message)
-            
-            # Add confidence and category info
-            confidence_emoji = "🎯" if confidence > 0.7 else "📍" if confidence > 0.4 else "❓"
+            faq_id, response, confidence, category = await self.find_best_answer(
+                user_message,
+                session_key=f"tg:{update.effective_chat.id}",
+                category=context.user_data.pop('category', None)
+            )
             
-            # Format response for Telegram
-            formatted_response = f"{confidence_emoji} **{category}**\n\n{response}"
+            # Pre-rendered with confidence and category info
+            formatted_response = self.replies.answer(faq_id, response, confidence, category, self.render_answer)
             
             # Add quick action buttons for low confidence responses
-            keyboard = None
-            if confidence < 0.4:
-                keyboard = [
-                    [InlineKeyboardButton("📞 Contact Support", url="tel:+15551234567")],
-                    [InlineKeyboardButton("🌐 Visit Website", url="https://college.edu/help")],
-                    [InlineKeyboardButton("📂 Browse Categories", callback_data="browse_categories")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-            else:
-                reply_markup = None
+            reply_markup = SUPPORT_KEYBOARD if confidence < 0.4 else None
                 
             await update.message.reply_text(
                 formatted_response, 
@@ -253,17 +412,73 @@ I'm here to help you with all your college-related questions!
             )
             
     def run(self):
-        """Run the Telegram bot"""
+        """Run the Telegram bot (long polling)"""
         logger.info("Starting Telegram College Helpdesk Bot...")
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        self.application.run_polling(allowed_updates=ALLOWED_UPDATES)
+        
+    def set_webhook(self, url: str, secret_token: str = None):
+        """Tell Telegram to deliver message and callback query updates to ``url``"""
+        async def register():
+            async with Bot(self.token, base_url=self.base_url or 'https://api.telegram.org/bot') as bot:
+                await bot.set_webhook(
+                    url, allowed_updates=ALLOWED_UPDATES, secret_token=secret_token,
+                    max_connections=self.concurrent_updates
+                )
+        asyncio.run(register())
+        
+    def start_webhook_worker(self):
+        """Start the Application on a background event loop, once per process"""
+        with self._webhook_lock:
+            # Threads do not survive fork(), so each server worker starts its own
+            if self._loop is not None and self._loop_pid == os.getpid():
+                return
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+            
+            def run():
+                asyncio.set_event_loop(loop)
+                try:
+                    loop.run_until_complete(self.application.initialize())
+                    loop.run_until_complete(self.application.start())
+                finally:
+                    started.set()
+                loop.run_forever()
+                
+            threading.Thread(target=run, name='telegram-updates', daemon=True).start()
+            started.wait()
+            self._loop = loop
+            self._loop_pid = os.getpid()
+            
+    def submit_update(self, data: Dict) -> bool:
+        """Queue a webhook update for processing; False when too many are already waiting"""
+        if not data or not any(kind in data for kind in ALLOWED_UPDATES):
+            # Nothing we handle (Telegram shouldn't send these, but it costs nothing to check)
+            return True
+        self.start_webhook_worker()
+        if self.application.update_queue.qsize() >= self.max_pending_updates:
+            return False
+        update = Update.de_json(data, self.application.bot)
+        self._loop.call_soon_threadsafe(self.application.update_queue.put_nowait, update)
+        return True
 
 # WhatsApp Integration (using Twilio)
 class WhatsAppCollegeBot:
-    def __init__(self, account_sid: str, auth_token: str, whatsapp_number: str):
+    def __init__(self, account_sid: str, auth_token: str, whatsapp_number: str,
+                 chatbot: CollegeChatbot = None, reply_budget: float = None):
         from twilio.rest import Client
+        from twilio.request_validator import RequestValidator
         self.client = Client(account_sid, auth_token)
+        self.validator = RequestValidator(auth_token)
         self.whatsapp_number = whatsapp_number
-        self.chatbot = CollegeChatbot()
+        self.chatbot = chatbot or CollegeChatbot()
+        # Seconds we are willing to hold Twilio's webhook request open before
+        # falling back to an outbound REST reply (Twilio itself gives up at 15s)
+        if reply_budget is None:
+            reply_budget = float(os.getenv('WHATSAPP_REPLY_BUDGET', '3.0'))
+        self.reply_budget = reply_budget
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='whatsapp')
+        self.replies = RenderedReplies(lambda: self.chatbot, lambda chatbot: render_answers(chatbot, self.format_response))
+        self.replies.get()
         
     def send_message(self, to_number: str, message: str):
         """Send WhatsApp message"""
@@ -278,27 +493,181 @@ class WhatsAppCollegeBot:
             logger.error(f"Error sending WhatsApp message: {e}")
             return None
             
+    def validate_request(self, url: str, params, signature: str) -> bool:
+        """Check the X-Twilio-Signature header of an incoming webhook"""
+        return self.validator.validate(url, params, signature)
+        
+    def format_response(self, response: str, confidence: float, category: str) -> str:
+        """Format a chatbot answer for WhatsApp"""
+        formatted_response = f"{CONFIDENCE_EMOJI[confidence_tier(confidence)]} *{category}*\n\n{response}"
+        
+        if confidence < 0.4:
+            formatted_response += "\n\n📞 *Need more help?*\nCall: (555) 123-4567\nEmail: help@college.edu"
+        return formatted_response
+        
+    def throttled_message(self, retry_after: float) -> str:
+        """Reply sent the first time a number exceeds its rate limit"""
+        return f"⏳ You're sending messages too quickly. Please wait {math.ceil(retry_after)}s and try again."
+        
+    def answer(self, from_number: str, message_body: str) -> str:
+        """Score a message, queue its log entry and return the formatted reply"""
+        faq_id, response, confidence, category = best_match(
+            self.chatbot, message_body, session_key=f"wa:{from_number}"
+        )
+        # Logging is a DB commit; keep it off the reply path
+        self.executor.submit(
+            self.chatbot.log_conversation, f"[WA:{from_number}] {message_body}", response, confidence
+        )
+        return self.replies.answer(faq_id, response, confidence, category, self.format_response)
+        
     def handle_webhook(self, request_data):
         """Handle incoming WhatsApp messages (for Flask webhook)"""
         from_number = request_data.get('From', '').replace('whatsapp:', '')
         message_body = request_data.get('Body', '')
         
         if message_body:
-            # Get response from chatbot
-            response, confidence, category = self.chatbot.find_best_answer(message_body)
-            
-            # Format response for WhatsApp
-            confidence_emoji = "🎯" if confidence > 0.7 else "📍" if confidence > 0.4 else "❓"
-            formatted_response = f"{confidence_emoji} *{category}*\n\n{response}"
-            
-            if confidence < 0.4:
-                formatted_response += "\n\n📞 *Need more help?*\nCall: (555) 123-4567\nEmail: help@college.edu"
+            decision = check_rate_limit('whatsapp', from_number)
+            if not decision.allowed:
+                if decision.rejected_in_row == 1:
+                    self.send_message(from_number, self.throttled_message(decision.retry_after))
+                return
                 
             # Send response
-            self.send_message(from_number, formatted_response)
+            self.send_message(from_number, self.answer(from_number, message_body))
             
-            # Log conversation
-            self.chatbot.log_conversation(f"[WA:{from_number}] {message_body}", response, confidence)
+    def handle_webhook_inline(self, request_data) -> str:
+        """Handle an incoming WhatsApp message and return a TwiML document.
+        
+        The reply is embedded in the webhook response when scoring finishes
+        within ``reply_budget`` seconds, saving the outbound REST round trip.
+        Slower answers are sent with ``send_message`` once they are ready.
+        """
+        from twilio.twiml.messaging_response import MessagingResponse
+        twiml = MessagingResponse()
+        
+        from_number = request_data.get('From', '').replace('whatsapp:', '')
+        message_body = request_data.get('Body', '')
+        if not message_body:
+            return str(twiml)
+            
+        decision = check_rate_limit('whatsapp', from_number)
+        if not decision.allowed:
+            if decision.rejected_in_row == 1:
+                twiml.message(self.throttled_message(decision.retry_after))
+            return str(twiml)
+            
+        future = self.executor.submit(self.answer, from_number, message_body)
+        try:
+            twiml.message(future.result(timeout=self.reply_budget))
+        except FutureTimeoutError:
+            logger.warning(f"WhatsApp reply to {from_number} exceeded {self.reply_budget}s, sending asynchronously")
+            future.add_done_callback(lambda f: self._send_late_reply(from_number, f))
+        except Exception as e:
+            logger.error(f"Error handling WhatsApp message: {e}")
+            twiml.message("❌ Sorry, I encountered an error. Please try again or contact support at help@college.edu")
+        return str(twiml)
+        
+    def _send_late_reply(self, from_number: str, future):
+        """Deliver an answer that missed the inline reply budget"""
+        if future.exception() is not None:
+            logger.error(f"Error handling WhatsApp message: {future.exception()}")
+            return
+        self.send_message(from_number, future.result())
+
+def register_whatsapp_webhook(flask_app, whatsapp_bot: WhatsAppCollegeBot, route: str = '/whatsapp-webhook'):
+    """Add the Twilio WhatsApp webhook route to a Flask app"""
+    from flask import request, Response, abort
+    
+    # Behind a reverse proxy request.url may not match the URL Twilio signed
+    public_url = os.getenv('WHATSAPP_WEBHOOK_URL')
+    
+    def whatsapp_webhook():
+        signature = request.headers.get('X-Twilio-Signature', '')
+        if not whatsapp_bot.validate_request(public_url or request.url, request.form, signature):
+            abort(403)
+        return Response(whatsapp_bot.handle_webhook_inline(request.form), mimetype='application/xml')
+        
+    flask_app.add_url_rule(route, 'whatsapp_webhook', whatsapp_webhook, methods=['POST'])
+
+def register_telegram_webhook(flask_app, telegram_bot: Optional[TelegramCollegeBot], route: str = '/telegram-webhook',
+                              tenant_bots: Dict[str, TelegramCollegeBot] = None):
+    """Add the Telegram webhook route to a Flask app.
+    
+    ``tenant_bots`` maps each tenant bot's webhook secret to the bot; updates
+    carrying one of those secrets go to it, the rest to ``telegram_bot``.
+    """
+    from flask import request, abort
+    
+    secret_token = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+    tenant_bots = tenant_bots or {}
+    
+    def telegram_webhook():
+        header = request.headers.get('X-Telegram-Bot-Api-Secret-Token')
+        bot = tenant_bots.get(header) if header else None
+        if bot is None:
+            if telegram_bot is None or (secret_token and header != secret_token):
+                abort(403)
+            bot = telegram_bot
+        if not bot.submit_update(request.get_json(silent=True)):
+            # Telegram retries non-2xx deliveries later, which is the backpressure we want
+            return '', 503, {'Retry-After': '1'}
+        return '', 200
+        
+    flask_app.add_url_rule(route, 'telegram_webhook', telegram_webhook, methods=['POST'])
+
+def attach_telegram_webhook(flask_app) -> Optional[TelegramCollegeBot]:
+    """Serve Telegram updates from the web app's process, sharing its FAQ index.
+    
+    Reads TELEGRAM_BOT_TOKEN and TELEGRAM_WEBHOOK_URL (the public HTTPS URL
+    Telegram posts to, e.g. via a reverse proxy); the route is that URL's path.
+    Tenants with a ``telegram_token`` get their own bot on the same route,
+    told apart by the webhook secret each one is registered with.
+    """
+    from urllib.parse import urlparse
+    from college_chatbot import chatbot, tenants
+    
+    token = os.getenv('TELEGRAM_BOT_TOKEN')
+    webhook_url = os.environ['TELEGRAM_WEBHOOK_URL']
+    secret_token = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+    set_webhooks = os.getenv('TELEGRAM_SET_WEBHOOK', '1') == '1'
+    
+    telegram_bot = None
+    if token and (tenants is None or tenants.tenant_for_telegram_token(token) is None):
+        telegram_bot = TelegramCollegeBot(token, chatbot=chatbot)
+        if set_webhooks:
+            telegram_bot.set_webhook(webhook_url, secret_token)
+            
+    tenant_bots = {}
+    for name, tenant in (tenants.tenants.items() if tenants is not None else ()):
+        if not tenant.telegram_token:
+            continue
+        # The tenant's FAQs load on its first update, not here
+        bot = TelegramCollegeBot(tenant.telegram_token, chatbot=functools.partial(tenants.get, name))
+        bot_secret = tenant_webhook_secret(tenant.telegram_token, secret_token)
+        if set_webhooks:
+            bot.set_webhook(webhook_url, bot_secret)
+        tenant_bots[bot_secret] = bot
+        
+    register_telegram_webhook(flask_app, telegram_bot, route=urlparse(webhook_url).path or '/telegram-webhook',
+                              tenant_bots=tenant_bots)
+    return telegram_bot
+
+def attach_whatsapp_webhook(flask_app) -> WhatsAppCollegeBot:
+    """Serve Twilio WhatsApp messages from the web app's process, sharing its FAQ index.
+    
+    Reads TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN and WHATSAPP_NUMBER; the route is
+    WHATSAPP_WEBHOOK_URL's path if set, else /whatsapp-webhook.
+    """
+    from urllib.parse import urlparse
+    from college_chatbot import chatbot
+    
+    whatsapp_bot = WhatsAppCollegeBot(
+        os.environ['TWILIO_ACCOUNT_SID'], os.environ['TWILIO_AUTH_TOKEN'], os.environ['WHATSAPP_NUMBER'],
+        chatbot=chatbot
+    )
+    route = urlparse(os.getenv('WHATSAPP_WEBHOOK_URL', '')).path or '/whatsapp-webhook'
+    register_whatsapp_webhook(flask_app, whatsapp_bot, route=route)
+    return whatsapp_bot
 
 # Configuration and main execution
 if __name__ == "__main__":
@@ -321,19 +690,46 @@ if __name__ == "__main__":
                 print("📝 Get token from @BotFather on Telegram")
                 sys.exit(1)
                 
-            bot = TelegramCollegeBot(TELEGRAM_TOKEN)
+            from college_chatbot import tenants
+            
+            # A tenant's bot token answers from that tenant's FAQs
+            tenant = tenants.tenant_for_telegram_token(TELEGRAM_TOKEN) if tenants is not None else None
+            bot = TelegramCollegeBot(TELEGRAM_TOKEN, chatbot=functools.partial(tenants.get, tenant) if tenant else None)
             print("🤖 Starting Telegram Bot...")
             print("📱 Message your bot to start chatting!")
             bot.run()
             
+        elif platform == 'telegram-webhook':
+            if (TELEGRAM_TOKEN == 'YOUR_TELEGRAM_BOT_TOKEN' and not os.getenv('TENANTS_CONFIG')) \
+                    or not os.getenv('TELEGRAM_WEBHOOK_URL'):
+                print("❌ Please set TELEGRAM_BOT_TOKEN and TELEGRAM_WEBHOOK_URL (public URL Telegram posts to)")
+                sys.exit(1)
+                
+            from college_chatbot import app
+            
+            attach_telegram_webhook(app)
+            port = int(os.getenv('PORT', 5000))
+            print("🤖 Starting Telegram webhook server...")
+            print(f"🌐 Webhook URL: {os.getenv('TELEGRAM_WEBHOOK_URL')} -> http://localhost:{port}")
+            print("💡 For production: python serve.py --telegram-webhook")
+            app.run(host='0.0.0.0', port=port, threaded=True)
+            
         elif platform == 'whatsapp':
             if TWILIO_ACCOUNT_SID == 'YOUR_TWILIO_SID':
                 print("❌ Please set your Twilio credentials in environment variables")
                 print("📝 Get credentials from Twilio Console")
                 sys.exit(1)
                 
-            print("📱 WhatsApp bot configured. Use with Flask webhook.")
-            print("🌐 Example webhook endpoint: /whatsapp-webhook")
+            from college_chatbot import app
+            
+            os.environ.setdefault('WHATSAPP_NUMBER', WHATSAPP_NUMBER)
+            attach_whatsapp_webhook(app)
+            
+            port = int(os.getenv('PORT', 5000))
+            print("📱 Starting WhatsApp webhook server...")
+            print(f"🌐 Webhook endpoint: http://localhost:{port}/whatsapp-webhook")
+            print("💡 For production: python serve.py --whatsapp-webhook")
+            app.run(host='0.0.0.0', port=port, threaded=True)
             
         else:
             print("❌ Invalid platform. Use 'telegram' or 'whatsapp'")
@@ -341,12 +737,17 @@ if __name__ == "__main__":
         print("🎓 College Helpdesk Bot - Platform Integration")
         print("\n📋 Available platforms:")
         print("  python telegram_bot.py telegram    # Start Telegram bot")
-        print("  python telegram_bot.py whatsapp    # WhatsApp info")
+        print("  python telegram_bot.py telegram-webhook  # Telegram via webhook, served with the web app")
+        print("  python telegram_bot.py whatsapp    # Start WhatsApp webhook server")
         print("\n🔧 Setup Requirements:")
         print("  Telegram: pip install python-telegram-bot")
         print("  WhatsApp: pip install twilio flask")
         print("\n📝 Environment Variables:")
         print("  TELEGRAM_BOT_TOKEN=your_telegram_token")
+        print("  TELEGRAM_WEBHOOK_URL=https://your.host/telegram-webhook   # webhook mode")
+        print("  TELEGRAM_WEBHOOK_SECRET=random_string  # checked on every webhook request")
+        print("  TELEGRAM_API_URL=http://localhost:8081/bot  # local or fake Bot API server")
         print("  TWILIO_ACCOUNT_SID=your_twilio_sid")
         print("  TWILIO_AUTH_TOKEN=your_twilio_token")
         print("  WHATSAPP_NUMBER=your_whatsapp_number")
+        print("  WHATSAPP_REPLY_BUDGET=3.0           # seconds before falling back to an outbound reply")
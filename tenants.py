@@ -0,0 +1,238 @@
+# Multi-tenant serving: one process answering for several colleges, each with its own FAQ database
+# Usage: TENANTS_CONFIG=tenants.json python serve.py
+#   {
+#     "memory_budget_mb": 512,
+#     "tenants": {
+#       "north": {"db": "north.db", "hosts": ["help.north.edu"], "telegram_token": "123:ABC"},
+#       "south": {"db": "south.db", "log_db": "south_logs.db", "path_prefix": "/south"}
+#     }
+#   }
+
+import json
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# WSGI environ key the middleware stores the resolved tenant name under
+TENANT_ENVIRON_KEY = 'helpdesk.tenant'
+
+
+class Tenant(NamedTuple):
+    name: str
+    db_path: str
+    log_db_path: Optional[str]      # None keeps chat logs in the FAQ database
+    hosts: Tuple[str, ...]          # Host headers served by this tenant, without port
+    path_prefix: Optional[str]      # e.g. "/south": /south/chat is this tenant's /chat
+    telegram_token: Optional[str]   # bot whose updates this tenant answers
+
+
+def estimate_size(root) -> int:
+    """Approximate bytes held by an object graph (containers and instance attributes, each object once)"""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, threading.Thread)) or callable(obj):
+            continue
+        seen.add(id(obj))
+        try:
+            total += sys.getsizeof(obj)
+        except TypeError:
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__dict__'):
+            stack.append(vars(obj))
+    return total
+
+
+class TenantRegistry:
+    """Tenant lookup by host, path prefix or Telegram token, and the chatbots loaded so far.
+
+    A tenant's chatbot is built on its first request and kept in LRU order.
+    After each load (and whenever a loaded tenant's FAQ version changes) the
+    least recently used tenants are closed and dropped until the estimated
+    size of all loaded FAQ indexes fits ``memory_budget_mb``; the tenant
+    being served is never evicted. Requests already holding an evicted
+    chatbot finish with it.
+    """
+
+    def __init__(self, tenants: List[Tenant], factory: Callable[[Tenant], object],
+                 memory_budget_mb: float = 1024):
+        self.tenants = {tenant.name: tenant for tenant in tenants}
+        self.factory = factory
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.by_host = {host.lower(): tenant.name for tenant in tenants for host in tenant.hosts}
+        # Longest prefix first, so "/north/law" wins over "/north"
+        self.by_prefix = sorted(
+            ((tenant.path_prefix.rstrip('/'), tenant.name) for tenant in tenants if tenant.path_prefix),
+            key=lambda item: -len(item[0])
+        )
+        self.by_telegram_token = {tenant.telegram_token: tenant.name for tenant in tenants if tenant.telegram_token}
+        # name -> [chatbot, estimated bytes, faq version the estimate was made for]
+        self.loaded = OrderedDict()
+        self.lock = threading.Lock()
+        # One loader per tenant; other tenants keep loading and serving meanwhile
+        self.load_locks = {name: threading.Lock() for name in self.tenants}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def resolve(self, host: str, path: str) -> Tuple[Optional[str], str, str]:
+        """(tenant name, path prefix, remaining path) for a request; the name is None for no tenant"""
+        for prefix, name in self.by_prefix:
+            if path == prefix or path.startswith(prefix + '/'):
+                return name, prefix, path[len(prefix):]
+        name = self.by_host.get((host or '').rsplit(':', 1)[0].lower())
+        return name, '', path
+
+    def tenant_for_telegram_token(self, token: str) -> Optional[str]:
+        """Tenant answering the Telegram bot with this token"""
+        return self.by_telegram_token.get(token)
+
+    def get(self, name: str):
+        """The tenant's chatbot, loading it (and evicting others) if needed"""
+        with self.lock:
+            entry = self.loaded.get(name)
+            if entry is not None:
+                self.loaded.move_to_end(name)
+                self.hits += 1
+        if entry is not None:
+            if entry[2] != entry[0].faq_version:
+                # Reloaded since it was measured (e.g. an import): the index may have grown
+                self._record(name, entry[0])
+            return entry[0]
+
+        with self.load_locks[name]:
+            with self.lock:
+                entry = self.loaded.get(name)
+            if entry is not None:
+                return entry[0]
+            tenant = self.tenants[name]
+            logger.info(f"Loading tenant {name} from {tenant.db_path}")
+            chatbot = self.factory(tenant)
+            with self.lock:
+                self.loads += 1
+            self._record(name, chatbot)
+        return chatbot
+
+    def _record(self, name: str, chatbot):
+        """Store a loaded chatbot with a fresh size estimate, then enforce the budget"""
+        version = chatbot.faq_version
+        # The index includes each question's SequenceMatcher state, which all of the worker's
+        # threads share (they keep no per-FAQ copies), so this covers what scoring holds
+        size = estimate_size((chatbot.index, chatbot.faqs_by_category))
+        evicted = []
+        with self.lock:
+            self.loaded[name] = [chatbot, size, version]
+            self.loaded.move_to_end(name)
+            while self.used() > self.memory_budget and len(self.loaded) > 1:
+                evicted_name, (evicted_chatbot, _, _) = self.loaded.popitem(last=False)
+                self.evictions += 1
+                evicted.append((evicted_name, evicted_chatbot))
+        if size > self.memory_budget:
+            logger.warning(f"Tenant {name} alone needs ~{size / 1048576:.1f} MB, "
+                           f"over the {self.memory_budget / 1048576:.1f} MB budget")
+        for evicted_name, evicted_chatbot in evicted:
+            logger.info(f"Evicting tenant {evicted_name} to stay within the memory budget")
+            # Flushes its queued chat logs and stops the writer thread
+            evicted_chatbot.close()
+
+    def used(self) -> int:
+        """Estimated bytes held by the loaded tenants' FAQ indexes"""
+        return sum(entry[1] for entry in self.loaded.values())
+
+    def preload(self, names: List[str]):
+        """Load and warm up tenants up front, e.g. in the server master so forked workers share them"""
+        for name in names:
+            self.get(name).warm_up()
+
+    def close(self):
+        """Flush every loaded tenant's chat logs"""
+        with self.lock:
+            chatbots = [entry[0] for entry in self.loaded.values()]
+        for chatbot in chatbots:
+            chatbot.close()
+
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint"""
+        with self.lock:
+            return {
+                'configured': len(self.tenants),
+                'loaded': list(self.loaded),
+                'memory_used_mb': round(self.used() / 1048576, 1),
+                'memory_budget_mb': round(self.memory_budget / 1048576, 1),
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
+
+
+class TenantMiddleware:
+    """WSGI middleware routing each request to its tenant.
+
+    A matching path prefix is moved from PATH_INFO to SCRIPT_NAME, so the
+    app's routes and relative links work unchanged under it; otherwise the
+    Host header decides. The tenant name (or nothing, for the default
+    database) is left in ``environ[TENANT_ENVIRON_KEY]``.
+    """
+
+    def __init__(self, app, registry: TenantRegistry):
+        self.app = app
+        self.registry = registry
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        name, prefix, remaining = self.registry.resolve(environ.get('HTTP_HOST', ''), path)
+        if prefix and not remaining:
+            # "/south" -> "/south/", so the page's relative URLs stay under the prefix
+            location = environ.get('SCRIPT_NAME', '') + prefix + '/'
+            query = environ.get('QUERY_STRING')
+            start_response('301 Moved Permanently', [('Location', location + ('?' + query if query else ''))])
+            return [b'']
+        if prefix:
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + prefix
+            environ['PATH_INFO'] = remaining
+        environ[TENANT_ENVIRON_KEY] = name
+        return self.app(environ, start_response)
+
+
+def load_tenants(path: str) -> Tuple[List[Tenant], Dict]:
+    """Tenants and registry settings from a JSON config file"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    tenants = []
+    for name, settings in config.get('tenants', {}).items():
+        prefix = settings.get('path_prefix')
+        if prefix and not prefix.startswith('/'):
+            prefix = '/' + prefix
+        tenants.append(Tenant(
+            name=name,
+            db_path=settings['db'],
+            log_db_path=settings.get('log_db'),
+            hosts=tuple(settings.get('hosts', ())),
+            path_prefix=prefix,
+            telegram_token=settings.get('telegram_token'),
+        ))
+    return tenants, config
+
+
+def registry_from_env(factory: Callable[[Tenant], object]) -> Optional[TenantRegistry]:
+    """Registry configured by $TENANTS_CONFIG, or None for a single-college deployment"""
+    path = os.getenv('TENANTS_CONFIG')
+    if not path:
+        return None
+    tenants, config = load_tenants(path)
+    budget = float(os.getenv('TENANTS_MEMORY_MB', config.get('memory_budget_mb', 1024)))
+    registry = TenantRegistry(tenants, factory, memory_budget_mb=budget)
+    registry.preload(config.get('preload', []))
+    return registry